@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Decode a frame set once into a memory-mapped alpha stack.
+
+The stack is an ``(N, H, W)`` uint8 ``.npy`` file holding each frame's alpha
+plane, with a sidecar ``<stack>.json`` index listing the frame names in stack
+order. Loading it returns a read-only ``np.memmap`` that the detectors accept
+directly (single frames as ``stack[i]``, or the whole stack in
+``detect_transparent_holes_batch``), so re-running detection with new parameters
+reads pages from the OS cache instead of decoding PNGs again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from image_utils import _load_frame
+
+
+def alpha_stack_index_path(stack_path: Union[str, Path]) -> Path:
+    stack_path = Path(stack_path)
+    return stack_path.with_name(stack_path.name + ".json")
+
+
+def build_alpha_stack(frame_paths: Sequence[Union[str, Path]], stack_path: Union[str, Path]) -> Path:
+    """Decode ``frame_paths`` into an alpha stack at ``stack_path`` and return its path.
+
+    Every frame must have the same size. Frames are decoded one at a time and
+    written straight into the memory-mapped output, so memory use stays at one
+    frame regardless of the stack size.
+    """
+    if not frame_paths:
+        raise ValueError("frame_paths must not be empty")
+    stack_path = Path(stack_path)
+    stack_path.parent.mkdir(parents=True, exist_ok=True)
+
+    first, _ = _load_frame(frame_paths[0], need_rgba=False)
+    shape = (len(frame_paths),) + first.shape
+    stack = np.lib.format.open_memmap(stack_path, mode="w+", dtype=np.uint8, shape=shape)
+    try:
+        stack[0] = first
+        for index, frame_path in enumerate(frame_paths[1:], start=1):
+            alpha, _ = _load_frame(frame_path, need_rgba=False)
+            if alpha.shape != first.shape:
+                raise ValueError(
+                    f"{frame_path} is {alpha.shape[1]}x{alpha.shape[0]}, "
+                    f"expected {first.shape[1]}x{first.shape[0]} like the first frame"
+                )
+            stack[index] = alpha
+        stack.flush()
+    finally:
+        del stack
+
+    index = {"shape": list(shape), "frames": [Path(frame_path).stem for frame_path in frame_paths]}
+    alpha_stack_index_path(stack_path).write_text(json.dumps(index, indent=2), encoding="utf-8")
+    return stack_path
+
+
+def load_alpha_stack(stack_path: Union[str, Path]) -> Tuple[np.memmap, List[str]]:
+    """Return the read-only ``(N, H, W)`` memmap and the frame names in stack order."""
+    stack = np.load(Path(stack_path), mmap_mode="r")
+    index = json.loads(alpha_stack_index_path(stack_path).read_text(encoding="utf-8"))
+    frames = list(index["frames"])
+    if stack.ndim != 3 or stack.dtype != np.uint8 or len(frames) != stack.shape[0]:
+        raise ValueError(f"{stack_path} does not match its index: {stack.dtype} {stack.shape}, {len(frames)} names")
+    return stack, frames
+
+
+def _natural_sort_key(path: Path) -> List[object]:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path.stem)]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Decode frame PNGs once into a memory-mapped alpha stack.")
+    parser.add_argument("frames_dir", type=Path, help="Directory containing the frame images.")
+    parser.add_argument("output", type=Path, help="Stack file to write (.npy); the index is written next to it.")
+    parser.add_argument("--pattern", default="f_*.png", help="Glob for frame files (default: f_*.png).")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    frame_paths = sorted(args.frames_dir.glob(args.pattern), key=_natural_sort_key)
+    if not frame_paths:
+        raise FileNotFoundError(f"No frames matching {args.pattern} in {args.frames_dir}")
+    build_alpha_stack(frame_paths, args.output)
+    stack, _ = load_alpha_stack(args.output)
+    print(f"Wrote {stack.shape[0]} frames of {stack.shape[2]}x{stack.shape[1]} alpha to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Benchmark the connected-components backends used by image_utils.
+
+Generates reproducible synthetic RGBA frames (seeded) with a configurable number
+of holes, hole shape and transparent noise density, and measures detection
+throughput and peak traced memory for every installed backend at each
+connectivity. Results print as a table and can be written as JSON (``--json``)
+and compared against an earlier run (``--compare``) to spot regressions between
+commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from image_utils import _resolve_backend, detect_primary_transparent_hole
+
+BACKENDS = ["scipy", "opencv", "numpy"]
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+    "4k": (2160, 3840),
+    "8k": (4320, 7680),
+}
+SHAPES = ["rect", "ellipse", "blob"]
+
+
+def make_alpha_frame(
+    height: int,
+    width: int,
+    *,
+    noise_density: float,
+    seed: int,
+    holes: int = 1,
+    shape: str = "rect",
+) -> np.ndarray:
+    """Return an alpha plane with ``holes`` transparent holes plus random transparent noise.
+
+    Holes are laid out on a grid of cells, each filling about half its cell; the
+    first hole is the largest so the expected answer is stable across seeds.
+    """
+    rng = np.random.default_rng(seed)
+    alpha = np.full((height, width), 255, dtype=np.uint8)
+    columns = int(np.ceil(np.sqrt(holes)))
+    rows = int(np.ceil(holes / columns))
+    cell_h, cell_w = height // rows, width // columns
+
+    for index in range(holes):
+        scale = 1.0 if index == 0 else 0.8
+        hole_h, hole_w = int(cell_h * 0.5 * scale), int(cell_w * 0.5 * scale)
+        top = (index // columns) * cell_h + (cell_h - hole_h) // 2
+        left = (index % columns) * cell_w + (cell_w - hole_w) // 2
+        region = alpha[top : top + hole_h, left : left + hole_w]
+        region[_hole_shape(hole_h, hole_w, shape=shape, rng=rng)] = 0
+
+    alpha[rng.random((height, width)) < noise_density] = 0
+    return alpha
+
+
+def _hole_shape(height: int, width: int, *, shape: str, rng: np.random.Generator) -> np.ndarray:
+    if shape == "rect":
+        return np.ones((height, width), dtype=bool)
+    yy = (np.arange(height)[:, None] + 0.5) / height * 2 - 1
+    xx = (np.arange(width)[None, :] + 0.5) / width * 2 - 1
+    if shape == "ellipse":
+        return yy**2 + xx**2 <= 1
+    if shape == "blob":
+        # Star-shaped region with a randomly wobbling radius: long ragged
+        # boundaries and many short runs per row.
+        angle = np.arctan2(yy, xx)
+        radius = 0.75 + sum(
+            rng.uniform(0.04, 0.1) * np.sin(frequency * angle + rng.uniform(0, 2 * np.pi))
+            for frequency in (3, 7, 13, 29)
+        )
+        return np.hypot(yy, xx) <= radius
+    raise ValueError(f"Unsupported hole shape: {shape}")
+
+
+def make_rgba_frame(alpha: np.ndarray, *, seed: int) -> np.ndarray:
+    """Wrap an alpha plane in an RGBA frame with noisy colour channels."""
+    rng = np.random.default_rng(seed)
+    rgba = np.empty(alpha.shape + (4,), dtype=np.uint8)
+    rgba[:, :, :3] = rng.integers(0, 256, size=(1, alpha.shape[1], 3), dtype=np.uint8)
+    rgba[:, :, 3] = alpha
+    return rgba
+
+
+def available_backends() -> List[str]:
+    names = []
+    for name in BACKENDS:
+        try:
+            _resolve_backend(name)  # type: ignore[arg-type]
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def time_backend(frame: np.ndarray, *, backend: str, connectivity: int, repeats: int) -> List[float]:
+    """Return the wall-clock time in seconds of each of ``repeats`` runs (after one warm-up)."""
+    detect_primary_transparent_hole(frame, backend=backend, connectivity=connectivity)  # type: ignore[arg-type]
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        detect_primary_transparent_hole(frame, backend=backend, connectivity=connectivity)  # type: ignore[arg-type]
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def peak_memory(frame: np.ndarray, *, backend: str, connectivity: int) -> int:
+    """Return the peak bytes traced by ``tracemalloc`` during one (untimed) detection."""
+    tracemalloc.start()
+    try:
+        detect_primary_transparent_hole(frame, backend=backend, connectivity=connectivity)  # type: ignore[arg-type]
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def environment() -> Dict[str, Any]:
+    info: Dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+    }
+    try:
+        import scipy
+
+        info["scipy"] = scipy.__version__
+    except ImportError:
+        pass
+    try:
+        import cv2
+
+        info["opencv"] = cv2.__version__
+    except ImportError:
+        pass
+    try:
+        info["commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def case_key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        record["resolution"],
+        record["holes"],
+        record["shape"],
+        record["noise_density"],
+        record["connectivity"],
+        record["backend"],
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare connected-components backends.")
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        choices=list(RESOLUTIONS),
+        default=["720p", "1080p"],
+        help="Frame sizes to benchmark.",
+    )
+    parser.add_argument(
+        "--noise-density",
+        nargs="+",
+        type=float,
+        default=[0.001],
+        help="Fractions of pixels made transparent at random outside the holes.",
+    )
+    parser.add_argument("--holes", nargs="+", type=int, default=[1], help="Numbers of holes per frame.")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=["rect"], help="Hole shapes.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=None, help="Backends (default: all installed).")
+    parser.add_argument("--connectivity", nargs="+", type=int, choices=[4, 8], default=[4, 8])
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for frame generation.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak-memory run per case.")
+    parser.add_argument("--json", type=Path, default=None, help="Write results as JSON to this path.")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        default=None,
+        help="Earlier --json output; adds each case's time ratio against it to the table.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    backends = [name for name in available_backends() if args.backends is None or name in args.backends]
+    baseline: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    if args.compare is not None:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        baseline = {case_key(record): record for record in previous["results"]}
+
+    header = (
+        f"{'resolution':<10} {'holes':>5} {'shape':<7} {'noise':>7} {'conn':>4} {'backend':<8} "
+        f"{'ms/frame':>10} {'MP/s':>8} {'peak MB':>8}"
+    )
+    print(header + ("  vs base" if baseline else ""))
+
+    records: List[Dict[str, Any]] = []
+    for resolution in args.resolutions:
+        height, width = RESOLUTIONS[resolution]
+        for holes in args.holes:
+            for shape in args.shapes:
+                for noise_density in args.noise_density:
+                    alpha = make_alpha_frame(
+                        height, width, noise_density=noise_density, seed=args.seed, holes=holes, shape=shape
+                    )
+                    frame = make_rgba_frame(alpha, seed=args.seed)
+                    del alpha
+                    for connectivity in args.connectivity:
+                        for backend in backends:
+                            times = time_backend(
+                                frame, backend=backend, connectivity=connectivity, repeats=args.repeats
+                            )
+                            median = statistics.median(times)
+                            peak: Optional[int] = None
+                            if not args.no_memory:
+                                peak = peak_memory(frame, backend=backend, connectivity=connectivity)
+                            record = {
+                                "resolution": resolution,
+                                "height": height,
+                                "width": width,
+                                "holes": holes,
+                                "shape": shape,
+                                "noise_density": noise_density,
+                                "connectivity": connectivity,
+                                "backend": backend,
+                                "repeats": args.repeats,
+                                "best_s": min(times),
+                                "median_s": median,
+                                "frames_per_s": 1.0 / median,
+                                "megapixels_per_s": height * width / median / 1e6,
+                                "peak_bytes": peak,
+                            }
+                            records.append(record)
+
+                            line = (
+                                f"{resolution:<10} {holes:>5} {shape:<7} {noise_density:>7.4f} {connectivity:>4} "
+                                f"{backend:<8} {median * 1000:>10.2f} {record['megapixels_per_s']:>8.1f} "
+                                f"{'-' if peak is None else f'{peak / 1e6:.1f}':>8}"
+                            )
+                            previous_record = baseline.get(case_key(record))
+                            if previous_record is not None:
+                                line += f"  {median / previous_record['median_s']:>6.2f}x"
+                            print(line, flush=True)
+
+    if args.json is not None:
+        payload = {"environment": environment(), "seed": args.seed, "results": records}
+        args.json.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
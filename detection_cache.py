@@ -0,0 +1,247 @@
+"""Persistent, content-addressed cache for transparent-hole detection results.
+
+Entries are keyed on a hash of the encoded frame bytes plus every parameter that
+changes the answer (thresholds, connectivity, backend and the versions of the
+libraries behind it), so renamed or copied frames still hit and any parameter or
+library change misses. Each entry is a small JSON file; once the entries take
+more than ``max_bytes`` of disk space (whole filesystem blocks, not just their
+JSON bytes) the cache evicts the least recently used ones down to 90% of it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import io
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image
+
+from image_utils import (
+    _available_backends,
+    _backend_order,
+    detect_primary_transparent_hole,
+    detect_transparent_holes_batch,
+)
+
+# Bump when detection output changes for the same inputs and parameters.
+DETECTION_VERSION = 1
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Eviction frees space down to this fraction of max_bytes, so a full cache does
+# not evict on every store.
+EVICT_TO_FRACTION = 0.9
+
+_CACHED_PARAMS = (
+    "alpha_threshold",
+    "min_area",
+    "backend",
+    "connectivity",
+    "top_k",
+    "pyramid_factor",
+    "mask_rle",
+    "contour_tolerance",
+    "inscribed_rect",
+)
+_DETECT_DEFAULTS = {
+    name: parameter.default
+    for name, parameter in inspect.signature(detect_primary_transparent_hole).parameters.items()
+    if name in _CACHED_PARAMS
+}
+
+
+def backend_version(backend: str) -> str:
+    """Describe the library versions that can serve ``backend`` in this process."""
+    import numpy
+
+    versions = [f"numpy={numpy.__version__}"]
+    available = set(_available_backends())
+    for name in _backend_order(backend):  # type: ignore[arg-type]
+        if name not in available:
+            continue
+        if name == "scipy":
+            import scipy
+
+            versions.append(f"scipy={scipy.__version__}")
+        elif name == "opencv":
+            import cv2
+
+            versions.append(f"opencv={cv2.__version__}")
+    return ",".join(versions)
+
+
+class DetectionCache:
+    """Directory of detection results keyed by frame content and parameters.
+
+    ``hits``, ``misses``, ``stores`` and ``evictions`` count activity in this
+    process; ``stats()`` adds the current entry count and size on disk.
+    """
+
+    def __init__(self, directory: Union[str, Path], *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be >= 1")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        # Entry path -> bytes on disk, least recently used first.
+        self._entries: "OrderedDict[Path, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._scan()
+
+    def key(self, content: bytes, **params: Any) -> str:
+        """Return the cache key for encoded frame bytes and detection parameters."""
+        unknown = set(params) - set(_CACHED_PARAMS)
+        if unknown:
+            raise ValueError(f"Unsupported cache parameters: {sorted(unknown)}")
+        description = {**_DETECT_DEFAULTS, **params}
+        description["backend_version"] = backend_version(str(description["backend"]))
+        description["detection_version"] = DETECTION_VERSION
+        digest = hashlib.blake2b(content, digest_size=20)
+        digest.update(json.dumps(description, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Return ``(found, result)``; ``result`` may be ``None`` for frames without a hole."""
+        path = self._path(key)
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        os.utime(path)  # keeps the LRU order for the next process that scans the cache
+        if path in self._entries:
+            self._entries.move_to_end(path)
+        return True, payload["result"]
+
+    def put(self, key: str, result: Optional[Dict[str, Any]]) -> None:
+        if result is not None and "timings" in result:
+            # Timings describe the run that produced the result, not the frame.
+            result = {name: value for name, value in result.items() if name != "timings"}
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"result": result}, separators=(",", ":")).encode("utf-8")
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_bytes(data)
+        temp_path.replace(path)
+
+        size = _disk_bytes(path.stat())
+        self._total_bytes += size - self._entries.pop(path, 0)
+        self._entries[path] = size
+        self.stores += 1
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def clear(self) -> None:
+        for path in list(self._entries):
+            path.unlink(missing_ok=True)
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _scan(self) -> None:
+        if not self.directory.is_dir():
+            return
+        found = []
+        for path in self.directory.glob("??/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime_ns, path, _disk_bytes(stat)))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._total_bytes += size
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is back under its low-water mark."""
+        target = int(self.max_bytes * EVICT_TO_FRACTION)
+        while self._entries and self._total_bytes > target:
+            path, size = self._entries.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+            self.evictions += 1
+
+
+def _disk_bytes(stat: os.stat_result) -> int:
+    """Space a file takes on disk: whole allocated blocks where the platform reports them."""
+    blocks = getattr(stat, "st_blocks", None)
+    return stat.st_size if blocks is None else max(blocks * 512, stat.st_size)
+
+
+def detect_primary_transparent_hole_cached(
+    cache: DetectionCache,
+    image_path: Union[str, Path],
+    **params: Any,
+) -> Optional[Dict[str, Any]]:
+    """``detect_primary_transparent_hole`` for an image file, served from ``cache`` when possible.
+
+    ``params`` are the detector's keyword arguments. Debug image outputs are not
+    cached, so requesting them always runs detection.
+    """
+    content = Path(image_path).read_bytes()
+    writes_outputs = params.get("overlay_output_path") is not None or params.get("mask_output_path") is not None
+    cache_params = {name: params[name] for name in _CACHED_PARAMS if name in params}
+    key = cache.key(content, **cache_params)
+    if not writes_outputs:
+        found, result = cache.get(key)
+        if found:
+            return result
+
+    with Image.open(io.BytesIO(content)) as img:
+        result = detect_primary_transparent_hole(img, **params)
+    cache.put(key, result)
+    return result
+
+
+def detect_transparent_holes_batch_cached(
+    cache: DetectionCache,
+    image_paths: Sequence[Union[str, Path]],
+    **params: Any,
+) -> List[Optional[Dict[str, Any]]]:
+    """``detect_transparent_holes_batch`` over image files, detecting only cache misses."""
+    keys = [cache.key(Path(path).read_bytes(), **params) for path in image_paths]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+    missing: List[int] = []
+    for index, key in enumerate(keys):
+        found, result = cache.get(key)
+        if found:
+            results[index] = result
+        else:
+            missing.append(index)
+
+    if missing:
+        fresh = detect_transparent_holes_batch([image_paths[index] for index in missing], **params)
+        for index, result in zip(missing, fresh):
+            cache.put(keys[index], result)
+            results[index] = result
+    return results
+
+
+def format_cache_stats(stats: Dict[str, int]) -> str:
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = 100.0 * stats["hits"] / lookups if lookups else 0.0
+    return (
+        f"Cache: {stats['hits']} hits, {stats['misses']} misses ({hit_rate:.1f}% hit rate), "
+        f"{stats['stores']} stored, {stats['evictions']} evicted; "
+        f"{stats['entries']} entries, {stats['bytes'] / 1024:.1f} KiB of {stats['max_bytes'] / 1024:.0f} KiB"
+    )
@@ -1,19 +1,33 @@
 #!/usr/bin/env python3
-"""Utilities for detecting the primary transparent hole in RGBA PNG images."""
+"""Utilities for detecting the primary transparent hole in RGBA images.
+
+Detection accepts image paths as well as already-decoded frames (NumPy alpha or
+RGBA arrays and PIL images), so callers holding frames in memory can skip the
+encode/decode round trip.
+"""
 
 from __future__ import annotations
 
+import json
+import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Literal, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple, Union
 
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageSequence
+
+BackendName = Literal["auto", "scipy", "opencv", "numpy"]
+OverlayRegion = Literal["full", "bbox"]
+ImageSource = Union[str, Path, np.ndarray, Image.Image]
 
-BackendName = Literal["auto", "scipy", "opencv"]
+AUTO_BACKEND_CACHE_ENV = "IMAGE_UTILS_BACKEND_CACHE"
+TIMING_STAGES = ("open", "decode", "convert", "threshold", "backend", "label", "stats", "encode", "write", "total")
 
 
 def detect_primary_transparent_hole(
-    image_path: Union[str, Path],
+    image_path: ImageSource,
     *,
     alpha_threshold: int = 250,
     min_area: int = 500,
@@ -21,17 +35,62 @@ def detect_primary_transparent_hole(
     connectivity: int = 8,
     overlay_output_path: Optional[Union[str, Path]] = None,
     mask_output_path: Optional[Union[str, Path]] = None,
+    overlay_region: OverlayRegion = "full",
+    overlay_downscale: int = 1,
+    top_k: Optional[int] = None,
+    pyramid_factor: Optional[int] = None,
+    mask_rle: bool = False,
+    contour_tolerance: Optional[float] = None,
+    band_height: Optional[int] = None,
+    timings: bool = False,
+    inscribed_rect: bool = False,
 ) -> Optional[Dict[str, Any]]:
     """Detect the largest meaningful transparent region in an RGBA image.
 
     Args:
-        image_path: Path to image file.
+        image_path: Path to an image file, or the frame itself: an ``(H, W)``
+            uint8 alpha array, an ``(H, W, 4)`` uint8 RGBA array, or an open
+            ``PIL.Image``. Arrays are read through views and never copied.
         alpha_threshold: Pixels with alpha < threshold are treated as transparent.
         min_area: Minimum component area to keep (filters transparent noise).
-        backend: Connected components backend: "auto", "scipy", or "opencv".
+        backend: Connected components backend: "auto", "scipy", "opencv", or
+            "numpy". "auto" times the installed backends on the first frame of
+            each size bucket and connectivity and reuses the fastest (see
+            ``set_auto_backend_cache_path`` to persist the choice).
         connectivity: Pixel connectivity for components: 4 or 8.
         overlay_output_path: Optional path to write a bright-green debug overlay.
         mask_output_path: Optional path to write a binary mask of the selected region.
+            A ``.npz`` suffix writes a bit-packed mask cropped to the bbox (read it
+            back with ``load_mask``); any other suffix writes an 8-bit image.
+        overlay_region: "full" writes the whole frame with the hole tinted;
+            "bbox" writes only the hole's bbox.
+        overlay_downscale: Integer factor to shrink the overlay by before saving.
+        top_k: If set, also report up to this many components from the same
+            labeling pass under ``components``.
+        pyramid_factor: If set (2, 4 or 8), find candidate holes on an alpha
+            plane pooled by this factor and label at full resolution only inside
+            their ROIs. Selected components, bboxes and areas match full-frame
+            detection (centroids up to float rounding), with ties between equal
+            areas resolved in raster order, which may differ from one-shot
+            OpenCV; this pays off on large frames where most pixels are opaque.
+        mask_rle: If True, include the selected region as ``mask_rle`` in the
+            format of ``encode_mask_rle``.
+        contour_tolerance: If set, include the outer boundary of the selected
+            region as ``polygon``, simplified so no pixel-corner boundary point is
+            further than this many pixels from it (0 keeps every corner).
+        band_height: If set, threshold and label the frame in horizontal bands of
+            this many rows and merge components across band seams, so labeling
+            memory is bounded by the band rather than the frame. Results match
+            one-shot detection, except that ties between equal areas are
+            resolved in raster order, which may differ from one-shot OpenCV.
+            Pass a memory-mapped alpha array to also keep the input out of
+            memory; files still have their alpha plane decoded in full. Cannot
+            be combined with image outputs, mask_rle, contour_tolerance,
+            inscribed_rect or pyramid_factor.
+        timings: If True, include per-stage wall-clock seconds as ``timings``
+            and add them to the process-level ``stage_timing_summary``.
+        inscribed_rect: If True, include the largest axis-aligned rectangle
+            lying entirely inside the selected region as ``inscribed_rect``.
 
     Returns:
         None if no transparent component passes min_area, otherwise a dict containing:
@@ -39,65 +98,1011 @@ def detect_primary_transparent_hole(
         - centroid: {x, y}
         - area: component area in pixels
         - backend: backend that produced the result
+        - backend_selection: only with backend="auto"; "calibrated" when the
+          backend won a timing run, "only-available" when nothing else is installed
+        - mask_rle: only when mask_rle is True; {size, counts}
+        - polygon: only when contour_tolerance is set; [[x, y], ...] pixel-corner
+          vertices of the outer boundary, clockwise on screen, implicitly closed
+        - inscribed_rect: only when inscribed_rect is True; {x, y, width, height}
+          of a largest-area rectangle made only of region pixels
+        - components: only when top_k is set; list of {bbox, centroid, area} for the
+          largest components passing min_area, largest first (ties in raster order).
+          The first entry is the primary hole.
+        - timings: only when timings is True; seconds per stage in
+          ``TIMING_STAGES`` order (stages that did not run are omitted). "open"
+          and "decode" cover reading the file, "convert" alpha/RGBA extraction,
+          "backend" the backend choice (including "auto" calibration), "encode"
+          mask_rle/polygon/inscribed_rect output and "write" debug images. Pyramid and banded
+          modes report their interleaved labeling work under "label".
     """
-    if connectivity not in (4, 8):
-        raise ValueError("connectivity must be 4 or 8")
-    if alpha_threshold <= 0 or alpha_threshold > 255:
-        raise ValueError("alpha_threshold must be in the range 1..255")
-    if min_area <= 0:
-        raise ValueError("min_area must be greater than 0")
+    _validate_detection_params(
+        alpha_threshold=alpha_threshold,
+        min_area=min_area,
+        connectivity=connectivity,
+        top_k=top_k,
+        pyramid_factor=pyramid_factor,
+        contour_tolerance=contour_tolerance,
+        band_height=band_height,
+    )
+    _validate_overlay_params(overlay_region=overlay_region, overlay_downscale=overlay_downscale)
 
-    image_path = Path(image_path)
-    with Image.open(image_path) as img:
-        rgba = np.array(img.convert("RGBA"), dtype=np.uint8)
+    timer = _StageTimer() if timings else _NULL_TIMER
+    if band_height is not None:
+        if (
+            overlay_output_path is not None
+            or mask_output_path is not None
+            or mask_rle
+            or contour_tolerance is not None
+            or inscribed_rect
+            or pyramid_factor is not None
+        ):
+            raise ValueError(
+                "band_height cannot be combined with image outputs, mask_rle, contour_tolerance, "
+                "inscribed_rect or pyramid_factor"
+            )
+        alpha, _ = _load_frame(image_path, need_rgba=False, timer=timer)
+        with timer.stage("backend"):
+            backend_name, backend_selection = _select_backend(
+                backend, alpha[:band_height] < alpha_threshold, connectivity=connectivity
+            )
+        with timer.stage("label"):
+            components = _find_components_banded(
+                alpha,
+                alpha_threshold=alpha_threshold,
+                min_area=min_area,
+                backend_name=backend_name,
+                connectivity=connectivity,
+                limit=top_k or 1,
+                band_height=band_height,
+            )
+        result = _public_result(components, top_k=top_k, backend_selection=backend_selection) if components else None
+        return timer.attach(result)
 
-    alpha = rgba[:, :, 3]
-    transparent_mask = alpha < alpha_threshold
+    alpha, rgba = _load_frame(image_path, need_rgba=overlay_output_path is not None, timer=timer)
+    with timer.stage("threshold"):
+        transparent_mask = alpha < alpha_threshold
+    with timer.stage("backend"):
+        backend_name, backend_selection = _select_backend(backend, transparent_mask, connectivity=connectivity)
 
-    selected = _find_largest_component(
+    components = _find_components(
         transparent_mask,
         min_area=min_area,
+        backend_name=backend_name,
+        connectivity=connectivity,
+        limit=top_k or 1,
+        pyramid_factor=pyramid_factor,
+        timer=timer,
+    )
+    if not components:
+        return timer.attach(None)
+    selected = components[0]
+
+    with timer.stage("write"):
+        _write_component_outputs(
+            selected,
+            transparent_mask.shape,
+            rgba=rgba,
+            overlay_output_path=overlay_output_path,
+            mask_output_path=mask_output_path,
+            overlay_region=overlay_region,
+            overlay_downscale=overlay_downscale,
+        )
+    result = _public_result(components, top_k=top_k, backend_selection=backend_selection)
+    with timer.stage("encode"):
+        if mask_rle:
+            result["mask_rle"] = _component_rle(selected, transparent_mask.shape)
+        if contour_tolerance is not None:
+            result["polygon"] = _component_polygon(selected, connectivity=connectivity, tolerance=contour_tolerance)
+        if inscribed_rect:
+            result["inscribed_rect"] = _component_inscribed_rect(selected)
+    return timer.attach(result)
+
+
+def detect_transparent_holes_batch(
+    frames: Union[Sequence[ImageSource], np.ndarray],
+    *,
+    alpha_threshold: int = 250,
+    min_area: int = 500,
+    backend: BackendName = "auto",
+    connectivity: int = 8,
+    top_k: Optional[int] = None,
+    pyramid_factor: Optional[int] = None,
+    timings: bool = False,
+) -> List[Optional[Dict[str, Any]]]:
+    """Detect the primary transparent hole in every frame of a batch.
+
+    Parameters are validated and the backend is resolved once for the whole
+    batch (once per frame size with "auto"), and the threshold mask buffer is
+    reused between frames of the same size, so per-frame overhead is limited to
+    decoding and labeling.
+
+    Args:
+        frames: Sequence of anything ``detect_primary_transparent_hole`` accepts,
+            an ``(N, H, W)`` uint8 alpha stack, or an ``(N, H, W, 4)`` RGBA stack.
+        alpha_threshold: Pixels with alpha < threshold are treated as transparent.
+        min_area: Minimum component area to keep (filters transparent noise).
+        backend: Connected components backend: "auto", "scipy", "opencv", or "numpy".
+        connectivity: Pixel connectivity for components: 4 or 8.
+        top_k: If set, also report up to this many components per frame.
+        pyramid_factor: If set (2, 4 or 8), use coarse-to-fine detection per frame.
+        timings: If True, time each frame's stages as ``detect_primary_transparent_hole``
+            does. Frames without a hole are still recorded in ``stage_timing_summary``.
+
+    Returns:
+        One entry per frame, in input order, with the same shape as the return
+        value of ``detect_primary_transparent_hole``.
+    """
+    _validate_detection_params(
+        alpha_threshold=alpha_threshold,
+        min_area=min_area,
+        connectivity=connectivity,
+        top_k=top_k,
+        pyramid_factor=pyramid_factor,
+    )
+    if isinstance(frames, np.ndarray) and not (
+        frames.ndim == 3 or (frames.ndim == 4 and frames.shape[3] == 4)
+    ):
+        raise ValueError("frame stack must have shape (N, H, W) or (N, H, W, 4)")
+
+    return list(
+        _detect_frames(
+            frames,
+            alpha_threshold=alpha_threshold,
+            min_area=min_area,
+            backend=backend,
+            connectivity=connectivity,
+            top_k=top_k,
+            pyramid_factor=pyramid_factor,
+            timings=timings,
+        )
+    )
+
+
+def iter_image_frames(image: Union[str, Path, Image.Image]) -> Iterator[Image.Image]:
+    """Yield every frame of a (possibly multi-frame) image file such as APNG, GIF or TIFF.
+
+    Frames are decoded one at a time as the iterator advances and the yielded
+    image is reused for the next frame, so copy it if it must outlive the step.
+    Files are closed when the iterator is exhausted or closed.
+    """
+    if isinstance(image, Image.Image):
+        yield from ImageSequence.Iterator(image)
+        return
+    with Image.open(Path(image)) as img:
+        yield from ImageSequence.Iterator(img)
+
+
+def iter_transparent_holes(
+    image: Union[str, Path, Image.Image],
+    *,
+    alpha_threshold: int = 250,
+    min_area: int = 500,
+    backend: BackendName = "auto",
+    connectivity: int = 8,
+    top_k: Optional[int] = None,
+    pyramid_factor: Optional[int] = None,
+    timings: bool = False,
+) -> Iterator[Optional[Dict[str, Any]]]:
+    """Stream hole detection over the frames of a multi-frame image.
+
+    Behaves like ``detect_transparent_holes_batch`` over every frame of an APNG,
+    animated GIF, multi-page TIFF or any other format Pillow can seek through,
+    but yields one result per frame as it is decoded, so only the current
+    frame's alpha plane is held in memory. Single-frame images yield one result.
+    Parameters are validated before the first frame is read.
+    """
+    _validate_detection_params(
+        alpha_threshold=alpha_threshold,
+        min_area=min_area,
+        connectivity=connectivity,
+        top_k=top_k,
+        pyramid_factor=pyramid_factor,
+    )
+    return _detect_frames(
+        iter_image_frames(image),
+        alpha_threshold=alpha_threshold,
+        min_area=min_area,
         backend=backend,
         connectivity=connectivity,
+        top_k=top_k,
+        pyramid_factor=pyramid_factor,
+        timings=timings,
     )
-    if selected is None:
-        return None
 
-    if overlay_output_path is not None:
-        _write_overlay_image(rgba, selected["mask"], Path(overlay_output_path))
-    if mask_output_path is not None:
-        _write_mask_image(selected["mask"], Path(mask_output_path))
 
-    return {
+def _detect_frames(
+    frames: Iterable[ImageSource],
+    *,
+    alpha_threshold: int,
+    min_area: int,
+    backend: BackendName,
+    connectivity: int,
+    top_k: Optional[int],
+    pyramid_factor: Optional[int],
+    timings: bool = False,
+) -> Iterator[Optional[Dict[str, Any]]]:
+    fixed_backend = None if backend == "auto" else _resolve_backend(backend)
+    backend_name, backend_selection = fixed_backend, None
+    mask_buffer: Optional[np.ndarray] = None
+
+    for frame in frames:
+        timer = _StageTimer() if timings else _NULL_TIMER
+        alpha, _ = _load_frame(frame, need_rgba=False, timer=timer)
+        resized = mask_buffer is None or mask_buffer.shape != alpha.shape
+        with timer.stage("threshold"):
+            if resized:
+                mask_buffer = np.empty(alpha.shape, dtype=bool)
+            np.less(alpha, alpha_threshold, out=mask_buffer)
+        if fixed_backend is None and resized:
+            with timer.stage("backend"):
+                backend_name, backend_selection = _select_backend(backend, mask_buffer, connectivity=connectivity)
+
+        components = _find_components(
+            mask_buffer,
+            min_area=min_area,
+            backend_name=backend_name,
+            connectivity=connectivity,
+            limit=top_k or 1,
+            pyramid_factor=pyramid_factor,
+            timer=timer,
+        )
+        result = _public_result(components, top_k=top_k, backend_selection=backend_selection) if components else None
+        yield timer.attach(result)
+
+
+def detect_transparent_holes_sweep(
+    image: ImageSource,
+    thresholds: Sequence[int],
+    *,
+    min_area: int = 500,
+    connectivity: int = 8,
+    top_k: Optional[int] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """Detect the primary hole at each of several alpha thresholds from one decode.
+
+    The alpha plane is decoded once and split into runs of pixels that become
+    transparent at the same threshold. Masks are nested (every pixel transparent
+    at one threshold is transparent at all higher ones), so thresholds are
+    processed in increasing order and each one only unions the run adjacencies
+    it newly activates into the previous threshold's components, instead of
+    labeling the frame again.
+
+    Args:
+        image: Anything ``detect_primary_transparent_hole`` accepts.
+        thresholds: Alpha thresholds to evaluate, in any order; duplicates allowed.
+        min_area: Minimum component area to keep (filters transparent noise).
+        connectivity: Pixel connectivity for components: 4 or 8.
+        top_k: If set, also report up to this many components per threshold.
+
+    Returns:
+        One entry per threshold, in the order given, identical to
+        ``detect_primary_transparent_hole(image, alpha_threshold=t, backend="numpy", ...)``.
+    """
+    for threshold in thresholds:
+        _validate_detection_params(
+            alpha_threshold=threshold, min_area=min_area, connectivity=connectivity, top_k=top_k
+        )
+    levels_sorted = np.unique(np.asarray(thresholds, dtype=np.int64))
+    if levels_sorted.size == 0:
+        return []
+
+    alpha, _ = _load_frame(image, need_rgba=False)
+    # A pixel's level is the index of the smallest threshold it is transparent at.
+    level_of_alpha = np.searchsorted(levels_sorted, np.arange(256), side="right").astype(np.uint8)
+    num_levels = levels_sorted.size
+    run_rows, run_starts, run_ends, run_levels = _level_runs(level_of_alpha[alpha], num_levels)
+    num_runs = run_rows.size
+
+    # Same-level runs can touch within a row as well as across rows. An edge
+    # joins the two runs from the level at which both are transparent.
+    touching = np.flatnonzero((run_rows[1:] == run_rows[:-1]) & (run_starts[1:] == run_ends[:-1]))
+    next_src, next_dst = _next_row_edges(
+        run_rows, run_starts, run_ends, width=alpha.shape[1], connectivity=connectivity
+    )
+    edge_src = np.concatenate([touching, next_src])
+    edge_dst = np.concatenate([touching + 1, next_dst])
+    edge_levels = np.maximum(run_levels[edge_src], run_levels[edge_dst])
+
+    lengths = run_ends - run_starts
+    weights_x = lengths * (run_starts + run_ends - 1) / 2
+    weights_y = lengths * run_rows
+    parent = np.arange(num_runs)
+    by_level: List[Optional[Dict[str, Any]]] = []
+    for level in range(num_levels):
+        new_edges = edge_levels == level
+        if new_edges.any():
+            merged = _union_find_roots(num_runs, parent[edge_src[new_edges]], parent[edge_dst[new_edges]])
+            parent = merged[parent]
+
+        # Label each component by its root run index + 1; roots are the smallest
+        # run index, i.e. the component's first run in raster order, as in the
+        # numpy backend.
+        active = run_levels <= level
+        labels = parent[active] + 1
+        size = num_runs + 1
+        areas = np.bincount(labels, weights=lengths[active], minlength=size).astype(np.int64)
+        x_min = np.full(size, alpha.shape[1], dtype=np.int64)
+        x_max = np.zeros(size, dtype=np.int64)
+        y_min = np.full(size, alpha.shape[0], dtype=np.int64)
+        y_max = np.zeros(size, dtype=np.int64)
+        np.minimum.at(x_min, labels, run_starts[active])
+        np.maximum.at(x_max, labels, run_ends[active])
+        np.minimum.at(y_min, labels, run_rows[active])
+        np.maximum.at(y_max, labels, run_rows[active])
+        centroids = np.zeros((size, 2), dtype=np.float64)
+        nonempty = areas > 0
+        centroids[nonempty, 0] = np.bincount(labels, weights=weights_x[active], minlength=size)[nonempty] / areas[nonempty]
+        centroids[nonempty, 1] = np.bincount(labels, weights=weights_y[active], minlength=size)[nonempty] / areas[nonempty]
+        labeling = {
+            "areas": areas,
+            "boxes": np.stack([x_min, y_min, x_max - x_min, y_max - y_min + 1], axis=1),
+            "centroids": centroids,
+            "backend": "numpy",
+        }
+        components = [
+            _describe_component(labeling, label)
+            for label in _largest_labels(labeling, min_area=min_area, limit=top_k or 1)
+        ]
+        by_level.append(_public_result(components, top_k=top_k) if components else None)
+
+    return [by_level[int(np.searchsorted(levels_sorted, threshold))] for threshold in thresholds]
+
+
+class TransparentHoleTracker:
+    """Sequence-aware hole detector that labels only around the previous hole.
+
+    Each frame is thresholded in full, but connected components are labeled
+    only inside the previous frame's bbox expanded by ``roi_margin``. The ROI
+    answer is accepted only when it provably equals the full-frame answer: the
+    hole must not touch an interior ROI edge, and it must be larger than the
+    transparent pixels outside the ROI plus every component cut by the ROI edge
+    (cut components may all belong to one full-frame component). Otherwise (or when the hole vanishes) the frame is labeled in
+    full and tracking restarts from that result.
+    """
+
+    def __init__(
+        self,
+        *,
+        alpha_threshold: int = 250,
+        min_area: int = 500,
+        backend: BackendName = "auto",
+        connectivity: int = 8,
+        roi_margin: int = 32,
+    ) -> None:
+        _validate_detection_params(
+            alpha_threshold=alpha_threshold,
+            min_area=min_area,
+            connectivity=connectivity,
+        )
+        if roi_margin < 0:
+            raise ValueError("roi_margin must be >= 0")
+        self.alpha_threshold = alpha_threshold
+        self.min_area = min_area
+        self.connectivity = connectivity
+        self.roi_margin = roi_margin
+        self.backend = backend
+        self.backend_name: Optional[str] = None if backend == "auto" else _resolve_backend(backend)
+        self._backend_selection: Optional[str] = None
+        self.roi_frames = 0
+        self.full_frames = 0
+        self._previous_bbox: Optional[Dict[str, int]] = None
+
+    def reset(self) -> None:
+        """Forget the previous hole so the next frame is labeled in full."""
+        self._previous_bbox = None
+
+    def detect(
+        self,
+        image: ImageSource,
+        *,
+        overlay_output_path: Optional[Union[str, Path]] = None,
+        mask_output_path: Optional[Union[str, Path]] = None,
+        overlay_region: OverlayRegion = "full",
+        overlay_downscale: int = 1,
+        mask_rle: bool = False,
+        contour_tolerance: Optional[float] = None,
+        timings: bool = False,
+        inscribed_rect: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Detect the primary hole in the next frame of the sequence.
+
+        Output arguments and the return value match ``detect_primary_transparent_hole``;
+        with ``timings`` the ROI labeling and its exactness checks count as "label".
+        """
+        _validate_overlay_params(overlay_region=overlay_region, overlay_downscale=overlay_downscale)
+        if contour_tolerance is not None and contour_tolerance < 0:
+            raise ValueError("contour_tolerance must be >= 0")
+        timer = _StageTimer() if timings else _NULL_TIMER
+        alpha, rgba = _load_frame(image, need_rgba=overlay_output_path is not None, timer=timer)
+        with timer.stage("threshold"):
+            transparent_mask = alpha < self.alpha_threshold
+        if self.backend_name is None:
+            with timer.stage("backend"):
+                self.backend_name, self._backend_selection = _select_backend(
+                    self.backend, transparent_mask, connectivity=self.connectivity
+                )
+
+        selected = None
+        if self._previous_bbox is not None:
+            with timer.stage("label"):
+                selected = self._detect_in_roi(transparent_mask, self._previous_bbox)
+        if selected is None:
+            self.full_frames += 1
+            components = _find_components(
+                transparent_mask,
+                min_area=self.min_area,
+                backend_name=self.backend_name,
+                connectivity=self.connectivity,
+                timer=timer,
+            )
+            selected = components[0] if components else None
+        else:
+            self.roi_frames += 1
+
+        if selected is None:
+            self._previous_bbox = None
+            return timer.attach(None)
+
+        self._previous_bbox = dict(selected["bbox"])
+        with timer.stage("write"):
+            _write_component_outputs(
+                selected,
+                transparent_mask.shape,
+                rgba=rgba,
+                overlay_output_path=overlay_output_path,
+                mask_output_path=mask_output_path,
+                overlay_region=overlay_region,
+                overlay_downscale=overlay_downscale,
+            )
+        result = _public_result([selected], backend_selection=self._backend_selection)
+        with timer.stage("encode"):
+            if mask_rle:
+                result["mask_rle"] = _component_rle(selected, transparent_mask.shape)
+            if contour_tolerance is not None:
+                result["polygon"] = _component_polygon(
+                    selected, connectivity=self.connectivity, tolerance=contour_tolerance
+                )
+            if inscribed_rect:
+                result["inscribed_rect"] = _component_inscribed_rect(selected)
+        return timer.attach(result)
+
+    def _detect_in_roi(self, mask: np.ndarray, bbox: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """Return the ROI answer if it is provably the full-frame answer, else None."""
+        height, width = mask.shape
+        x0 = max(bbox["x"] - self.roi_margin, 0)
+        y0 = max(bbox["y"] - self.roi_margin, 0)
+        x1 = min(bbox["x"] + bbox["width"] + self.roi_margin, width)
+        y1 = min(bbox["y"] + bbox["height"] + self.roi_margin, height)
+
+        roi_mask = mask[y0:y1, x0:x1]
+        assert self.backend_name is not None
+        labeling = _LABELERS[self.backend_name](roi_mask, connectivity=self.connectivity)
+        labels = _largest_labels(labeling, min_area=self.min_area, limit=1)
+        if not labels:
+            return None
+
+        cut_labels = _labels_on_edges(
+            labeling,
+            top=y0 > 0,
+            bottom=y1 < height,
+            left=x0 > 0,
+            right=x1 < width,
+        )
+        if labels[0] in cut_labels:
+            return None
+
+        area = int(labeling["areas"][labels[0]])
+        outside = int(np.count_nonzero(mask)) - int(np.count_nonzero(roi_mask))
+        # Cut components can join up outside the ROI, so only their total bounds the merge.
+        cut_area = int(labeling["areas"][cut_labels].sum())
+        if outside + cut_area >= area:
+            return None
+
+        selected = _describe_component(labeling, labels[0])
+        _offset_component(selected, x0, y0)
+        return selected
+
+
+def encode_mask_rle(mask: np.ndarray) -> Dict[str, Any]:
+    """Run-length encode a boolean mask in row-major order.
+
+    Returns ``{"size": [height, width], "counts": [...]}`` where counts
+    alternate background/foreground lengths, starting with background (which
+    may be 0). The encoding is JSON-serializable; see ``decode_mask_rle``.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim != 2:
+        raise ValueError("mask must be 2-D")
+    run_rows, run_starts, run_ends = _mask_runs(mask)
+    return _rle_from_runs(run_rows, run_starts, run_ends, mask.shape)
+
+
+def decode_mask_rle(rle: Dict[str, Any]) -> np.ndarray:
+    """Decode the output of ``encode_mask_rle`` back into a boolean mask."""
+    height, width = (int(v) for v in rle["size"])
+    counts = np.asarray(rle["counts"], dtype=np.int64)
+    if counts.sum() != height * width:
+        raise ValueError("RLE counts do not add up to the mask size")
+
+    boundaries = np.cumsum(counts)
+    steps = np.zeros(height * width + 1, dtype=np.int8)
+    np.add.at(steps, boundaries[0::2][: counts.size // 2], 1)
+    np.add.at(steps, boundaries[1::2], -1)
+    return np.cumsum(steps[:-1], dtype=np.int8).view(bool).reshape(height, width)
+
+
+def save_mask_npz(path: Union[str, Path], mask: np.ndarray) -> None:
+    """Save a boolean mask as a bit-packed ``.npz`` cropped to its bbox."""
+    mask = np.asarray(mask, dtype=bool)
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0:
+        _save_mask_npz_crop(Path(path), np.zeros((0, 0), dtype=bool), (0, 0), mask.shape)
+        return
+    crop = mask[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1]
+    _save_mask_npz_crop(Path(path), crop, (int(cols[0]), int(rows[0])), mask.shape)
+
+
+def load_mask(path: Union[str, Path]) -> np.ndarray:
+    """Load a mask written by the detector, as ``.npz`` (bit-packed) or an image."""
+    path = Path(path)
+    if path.suffix.lower() == ".npz":
+        with np.load(path) as stored:
+            height, width = (int(v) for v in stored["shape"])
+            crop_height, crop_width = (int(v) for v in stored["crop_shape"])
+            x0, y0 = (int(v) for v in stored["offset"])
+            crop = np.unpackbits(stored["packed"], count=crop_height * crop_width).view(bool)
+        mask = np.zeros((height, width), dtype=bool)
+        mask[y0 : y0 + crop_height, x0 : x0 + crop_width] = crop.reshape(crop_height, crop_width)
+        return mask
+    with Image.open(path) as img:
+        return np.asarray(img.convert("L")) > 0
+
+
+def _rle_from_runs(
+    run_rows: np.ndarray,
+    run_starts: np.ndarray,
+    run_ends: np.ndarray,
+    shape: Tuple[int, int],
+) -> Dict[str, Any]:
+    height, width = shape
+    starts = run_rows * width + run_starts
+    ends = run_rows * width + run_ends
+    if starts.size:
+        # A run reaching the right edge continues into one starting the next row.
+        split = starts[1:] != ends[:-1]
+        starts = starts[np.concatenate(([True], split))]
+        ends = ends[np.concatenate((split, [True]))]
+    boundaries = np.empty(starts.size * 2, dtype=np.int64)
+    boundaries[0::2] = starts
+    boundaries[1::2] = ends
+    counts = np.diff(boundaries, prepend=0)
+    if not boundaries.size or boundaries[-1] != height * width:
+        counts = np.append(counts, height * width - (boundaries[-1] if boundaries.size else 0))
+    return {"size": [height, width], "counts": counts.tolist()}
+
+
+def _component_rle(selected: Dict[str, Any], shape: Tuple[int, int]) -> Dict[str, Any]:
+    """RLE-encode a selected component using only its bbox crop."""
+    bbox = selected["bbox"]
+    run_rows, run_starts, run_ends = _mask_runs(_component_crop(selected))
+    return _rle_from_runs(run_rows + bbox["y"], run_starts + bbox["x"], run_ends + bbox["x"], shape)
+
+
+# Preferred turn at a vertex where the boundary touches itself diagonally. Left
+# turns keep diagonal neighbours inside one 8-connected outline; right turns
+# split them as 4-connectivity does. Headings are (dx, dy) with y pointing down.
+_LEFT_TURN = {(1, 0): (0, -1), (0, -1): (-1, 0), (-1, 0): (0, 1), (0, 1): (1, 0)}
+_RIGHT_TURN = {heading: (-turn[0], -turn[1]) for heading, turn in _LEFT_TURN.items()}
+
+
+def _component_polygon(selected: Dict[str, Any], *, connectivity: int, tolerance: float) -> List[List[int]]:
+    """Trace the outer pixel-corner boundary of a component and simplify it.
+
+    Boundary edges are merged into maximal horizontal and vertical segments of
+    the bbox crop (vectorized), so the walk visits one segment per polygon
+    corner rather than one per boundary pixel. The walk keeps the region on its
+    right and starts at the top edge of the first pixel in raster order, which
+    always lies on the outer boundary; interior holes are ignored.
+    """
+    crop = _component_crop(selected)
+    height, width = crop.shape
+    padded = np.zeros((height + 2, width + 2), dtype=bool)
+    padded[1:-1, 1:-1] = crop
+    inner = padded[1:-1, 1:-1]
+
+    # Outgoing segments keyed by start vertex: horizontal ones are followed by
+    # vertical ones and vice versa.
+    horizontal: Dict[Tuple[int, int], List[Tuple[Tuple[int, int], Tuple[int, int]]]] = {}
+    vertical: Dict[Tuple[int, int], List[Tuple[Tuple[int, int], Tuple[int, int]]]] = {}
+
+    rows, starts, ends = _mask_runs(inner & ~padded[:-2, 1:-1])  # top edges, heading east
+    for y, x0, x1 in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        horizontal.setdefault((x0, y), []).append(((x1, y), (1, 0)))
+    rows, starts, ends = _mask_runs(inner & ~padded[2:, 1:-1])  # bottom edges, heading west
+    for y, x0, x1 in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        horizontal.setdefault((x1, y + 1), []).append(((x0, y + 1), (-1, 0)))
+    cols, starts, ends = _mask_runs((inner & ~padded[1:-1, 2:]).T)  # right edges, heading south
+    for x, y0, y1 in zip(cols.tolist(), starts.tolist(), ends.tolist()):
+        vertical.setdefault((x + 1, y0), []).append(((x + 1, y1), (0, 1)))
+    cols, starts, ends = _mask_runs((inner & ~padded[1:-1, :-2]).T)  # left edges, heading north
+    for x, y0, y1 in zip(cols.tolist(), starts.tolist(), ends.tolist()):
+        vertical.setdefault((x, y1), []).append(((x, y0), (0, -1)))
+
+    preferred_turn = _LEFT_TURN if connectivity == 8 else _RIGHT_TURN
+    start = (int(np.argmax(crop[0])), 0)
+    vertex, heading = horizontal[start][0]
+    corners = [start]
+    on_horizontal = True
+    while vertex != start:
+        corners.append(vertex)
+        options = (vertical if on_horizontal else horizontal)[vertex]
+        if len(options) > 1:
+            options = [option for option in options if option[1] == preferred_turn[heading]]
+        vertex, heading = options[0]
+        on_horizontal = not on_horizontal
+
+    points = np.asarray(corners, dtype=np.int64) + (selected["bbox"]["x"], selected["bbox"]["y"])
+    return _simplify_closed_polygon(points, tolerance).tolist()
+
+
+def _simplify_closed_polygon(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Ramer-Douglas-Peucker simplification of a closed ring of vertices."""
+    count = len(points)
+    if tolerance <= 0 or count <= 4:
+        return points
+
+    # Split the ring at vertex 0 and the vertex furthest from it.
+    far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    ring = np.vstack([points, points[:1]]).astype(np.float64)
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, far]] = True
+    pending = [(0, far), (far, count)]
+    while pending:
+        first, last = pending.pop()
+        if last - first < 2:
+            continue
+        anchor, direction = ring[first], ring[last] - ring[first]
+        offsets = ring[first + 1 : last] - anchor
+        length = np.hypot(*direction)
+        if length == 0:
+            distances = np.hypot(*offsets.T)
+        else:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            pending.append((first, split))
+            pending.append((split, last))
+    return points[keep]
+
+
+def _component_inscribed_rect(selected: Dict[str, Any]) -> Dict[str, int]:
+    """Return the largest axis-aligned rectangle inside a component, in frame coordinates."""
+    crop = _component_crop(selected)
+    # The DP loops over rows in Python, so run it along the shorter side.
+    if crop.shape[0] > crop.shape[1]:
+        y, x, height, width = _largest_rectangle(crop.T)
+    else:
+        x, y, width, height = _largest_rectangle(crop)
+    return {"x": selected["bbox"]["x"] + x, "y": selected["bbox"]["y"] + y, "width": width, "height": height}
+
+
+def _largest_rectangle(mask: np.ndarray) -> Tuple[int, int, int, int]:
+    """Return (x, y, width, height) of the largest all-True rectangle in a non-empty mask.
+
+    Row-by-row maximal-rectangle DP: for each column, ``heights`` is the run of
+    True cells ending at the current row, and ``left``/``right`` bound the widest
+    span of columns at least that tall, narrowed from the row above by the
+    current row's run (found with running max/min accumulations). Each row is a
+    handful of vector operations, so the whole search is O(H * W).
+    """
+    height, width = mask.shape
+    columns = np.arange(width)
+    heights = np.zeros(width, dtype=np.int64)
+    left = np.zeros(width, dtype=np.int64)
+    right = np.full(width, width, dtype=np.int64)
+    best_area, best = 0, (0, 0, 0, 0)
+
+    for row_index in range(height):
+        row = mask[row_index]
+        heights = np.where(row, heights + 1, 0)
+        run_left = np.maximum.accumulate(np.where(row, 0, columns + 1))
+        run_right = np.minimum.accumulate(np.where(row, width, columns)[::-1])[::-1]
+        left = np.where(row, np.maximum(left, run_left), 0)
+        right = np.where(row, np.minimum(right, run_right), width)
+        areas = heights * (right - left)
+        column = int(np.argmax(areas))
+        if areas[column] > best_area:
+            best_area = int(areas[column])
+            rect_height = int(heights[column])
+            best = (int(left[column]), row_index - rect_height + 1, int(right[column] - left[column]), rect_height)
+    return best
+
+
+def _save_mask_npz_crop(path: Path, crop: np.ndarray, offset: Tuple[int, int], shape: Tuple[int, ...]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path,
+        packed=np.packbits(crop, axis=None),
+        shape=np.asarray(shape, dtype=np.int64),
+        crop_shape=np.asarray(crop.shape, dtype=np.int64),
+        offset=np.asarray(offset, dtype=np.int64),
+    )
+
+
+def _load_frame(
+    image: ImageSource,
+    *,
+    need_rgba: bool,
+    timer: Optional["_StageTimer"] = None,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return the ``(H, W)`` alpha plane and, if requested, an ``(H, W, 4)`` RGBA array.
+
+    NumPy inputs are returned as views. PIL images and files only have their
+    alpha plane decoded unless RGBA pixels are needed for an overlay.
+    """
+    timer = timer or _NULL_TIMER
+    if isinstance(image, np.ndarray):
+        if image.dtype != np.uint8:
+            raise ValueError(f"image arrays must be uint8, got {image.dtype}")
+        if image.ndim == 2:
+            rgba = None
+            if need_rgba:
+                with timer.stage("convert"):
+                    rgba = np.empty(image.shape + (4,), dtype=np.uint8)
+                    rgba[:, :, :3] = 255
+                    rgba[:, :, 3] = image
+            return image, rgba
+        if image.ndim == 3 and image.shape[2] == 4:
+            return image[:, :, 3], image
+        raise ValueError("image arrays must have shape (H, W) or (H, W, 4)")
+
+    if isinstance(image, Image.Image):
+        return _alpha_from_pil(image, need_rgba=need_rgba, timer=timer)
+
+    with timer.stage("open"):
+        img = Image.open(Path(image))
+    with img:
+        return _alpha_from_pil(img, need_rgba=need_rgba, timer=timer)
+
+
+def _alpha_from_pil(
+    img: Image.Image,
+    *,
+    need_rgba: bool,
+    timer: Optional["_StageTimer"] = None,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    timer = timer or _NULL_TIMER
+    with timer.stage("decode"):
+        img.load()
+    with timer.stage("convert"):
+        if need_rgba:
+            rgba = np.asarray(img.convert("RGBA"), dtype=np.uint8)
+            return rgba[:, :, 3], rgba
+        return _decode_alpha(img), None
+
+
+class _StageTimer:
+    """Accumulate wall-clock seconds per detection stage for one call."""
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def attach(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Finish timing, record it process-wide and add it to ``result`` if there is one."""
+        self.seconds["total"] = time.perf_counter() - self._start
+        timings = {name: self.seconds[name] for name in TIMING_STAGES if name in self.seconds}
+        for name, seconds in timings.items():
+            _stage_samples.setdefault(name, []).append(seconds)
+        if result is not None:
+            result["timings"] = timings
+        return result
+
+
+class _NullTimer(_StageTimer):
+    """Stand-in for ``_StageTimer`` when timing is off."""
+
+    def __init__(self) -> None:
+        pass
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        yield
+
+    def attach(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return result
+
+
+_NULL_TIMER = _NullTimer()
+_stage_samples: Dict[str, List[float]] = {}
+
+
+def stage_timing_summary() -> Dict[str, Dict[str, float]]:
+    """Summarize stage timings recorded by calls made with ``timings=True``.
+
+    Returns ``{stage: {count, total, mean, p50, p90, p99, max}}`` in seconds,
+    in ``TIMING_STAGES`` order, across every timed call in this process since
+    the last ``clear_stage_timings``.
+    """
+    summary: Dict[str, Dict[str, float]] = {}
+    for name in TIMING_STAGES:
+        samples = _stage_samples.get(name)
+        if not samples:
+            continue
+        values = np.asarray(samples, dtype=np.float64)
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        summary[name] = {
+            "count": int(values.size),
+            "total": float(values.sum()),
+            "mean": float(values.mean()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "max": float(values.max()),
+        }
+    return summary
+
+
+def clear_stage_timings() -> None:
+    _stage_samples.clear()
+
+
+def stage_timing_samples() -> Dict[str, List[float]]:
+    """Return a copy of the raw per-stage samples behind ``stage_timing_summary``."""
+    return {name: list(samples) for name, samples in _stage_samples.items()}
+
+
+def record_stage_timings(samples: Dict[str, List[float]]) -> None:
+    """Add samples from ``stage_timing_samples`` (e.g. of a worker process) to this process."""
+    for name, values in samples.items():
+        _stage_samples.setdefault(name, []).extend(values)
+
+
+def _decode_alpha(img: Image.Image) -> np.ndarray:
+    """Extract only the ``(H, W)`` alpha plane, without converting to RGBA.
+
+    Images with an alpha band (RGBA, LA, PA, ...) return that band. Palette
+    images map their indices through a 256-entry alpha table built from an
+    RGBA palette and/or ``tRNS`` transparency. Images without transparency
+    are fully opaque. Anything else (e.g. an RGB colour key) falls back to an
+    RGBA conversion.
+    """
+    if "A" in img.getbands():
+        return np.asarray(img.getchannel("A"), dtype=np.uint8)
+
+    transparency = img.info.get("transparency")
+    if img.mode == "P":
+        alpha_table = np.full(256, 255, dtype=np.uint8)
+        if img.palette is not None and img.palette.mode == "RGBA":
+            palette_alpha = np.asarray(img.getpalette("RGBA"), dtype=np.uint8)[3::4]
+            alpha_table[: palette_alpha.size] = palette_alpha
+        if isinstance(transparency, bytes):
+            alpha_table[: len(transparency)] = np.frombuffer(transparency, dtype=np.uint8)[:256]
+        elif isinstance(transparency, int):
+            alpha_table[transparency] = 0
+        return alpha_table[np.asarray(img)]
+
+    if transparency is None:
+        img.load()  # still surface truncated or corrupt files
+        return np.full((img.height, img.width), 255, dtype=np.uint8)
+    if img.mode == "L" and isinstance(transparency, int):
+        return np.where(np.asarray(img) == transparency, 0, 255).astype(np.uint8)
+    return np.asarray(img.convert("RGBA").getchannel("A"), dtype=np.uint8)
+
+
+def _validate_detection_params(
+    *,
+    alpha_threshold: int,
+    min_area: int,
+    connectivity: int,
+    top_k: Optional[int] = None,
+    pyramid_factor: Optional[int] = None,
+    contour_tolerance: Optional[float] = None,
+    band_height: Optional[int] = None,
+) -> None:
+    if connectivity not in (4, 8):
+        raise ValueError("connectivity must be 4 or 8")
+    if alpha_threshold <= 0 or alpha_threshold > 255:
+        raise ValueError("alpha_threshold must be in the range 1..255")
+    if min_area <= 0:
+        raise ValueError("min_area must be greater than 0")
+    if top_k is not None and top_k <= 0:
+        raise ValueError("top_k must be greater than 0")
+    if pyramid_factor is not None and pyramid_factor not in _LANE_DTYPES:
+        raise ValueError("pyramid_factor must be 2, 4 or 8")
+    if contour_tolerance is not None and contour_tolerance < 0:
+        raise ValueError("contour_tolerance must be >= 0")
+    if band_height is not None and band_height < 1:
+        raise ValueError("band_height must be at least 1")
+
+
+def _validate_overlay_params(*, overlay_region: str, overlay_downscale: int) -> None:
+    if overlay_region not in ("full", "bbox"):
+        raise ValueError('overlay_region must be "full" or "bbox"')
+    if overlay_downscale < 1:
+        raise ValueError("overlay_downscale must be at least 1")
+
+
+def _public_result(
+    components: List[Dict[str, Any]],
+    *,
+    top_k: Optional[int] = None,
+    backend_selection: Optional[str] = None,
+) -> Dict[str, Any]:
+    selected = components[0]
+    result: Dict[str, Any] = {
         "bbox": selected["bbox"],
         "centroid": selected["centroid"],
         "area": selected["area"],
         "backend": selected["backend"],
     }
+    if backend_selection is not None:
+        result["backend_selection"] = backend_selection
+    if top_k is not None:
+        result["components"] = [
+            {"bbox": component["bbox"], "centroid": component["centroid"], "area": component["area"]}
+            for component in components
+        ]
+    return result
 
 
-def _find_largest_component(
+def _find_components(
     mask: np.ndarray,
     *,
     min_area: int,
-    backend: BackendName,
+    backend_name: str,
     connectivity: int,
-) -> Optional[Dict[str, Any]]:
-    backends_to_try = _backend_order(backend)
+    limit: int = 1,
+    pyramid_factor: Optional[int] = None,
+    timer: Optional["_StageTimer"] = None,
+) -> List[Dict[str, Any]]:
+    """Label ``mask`` once and describe its ``limit`` largest components."""
+    timer = timer or _NULL_TIMER
+    if pyramid_factor is not None:
+        with timer.stage("label"):
+            return _find_components_pyramid(
+                mask,
+                min_area=min_area,
+                backend_name=backend_name,
+                connectivity=connectivity,
+                limit=limit,
+                factor=pyramid_factor,
+            )
+    with timer.stage("label"):
+        labeling = _LABELERS[backend_name](mask, connectivity=connectivity)
+    with timer.stage("stats"):
+        return [
+            _describe_component(labeling, label)
+            for label in _largest_labels(labeling, min_area=min_area, limit=limit)
+        ]
+
+
+def _resolve_backend(backend: BackendName) -> str:
+    """Return the first backend in the requested order whose module imports."""
     last_error: Optional[Exception] = None
 
-    for backend_name in backends_to_try:
+    for backend_name in _backend_order(backend):
         try:
             if backend_name == "scipy":
-                return _find_largest_component_scipy(mask, min_area=min_area, connectivity=connectivity)
-            if backend_name == "opencv":
-                return _find_largest_component_opencv(mask, min_area=min_area, connectivity=connectivity)
+                import scipy.ndimage  # noqa: F401
+            elif backend_name == "opencv":
+                import cv2  # noqa: F401
         except ImportError as exc:
             last_error = exc
             continue
+        return backend_name
 
-    if last_error is None:
-        return None
     raise ImportError(
         "No connected-components backend available. Install scipy or opencv-python."
     ) from last_error
@@ -105,20 +1110,140 @@ def _find_largest_component(
 
 def _backend_order(backend: BackendName) -> list[str]:
     if backend == "auto":
-        return ["scipy", "opencv"]
+        return ["scipy", "opencv", "numpy"]
     if backend == "scipy":
         return ["scipy"]
     if backend == "opencv":
         return ["opencv"]
+    if backend == "numpy":
+        return ["numpy"]
     raise ValueError(f"Unsupported backend: {backend}")
 
 
-def _find_largest_component_scipy(
+# Per-process "auto" decisions keyed by "<size bucket>:<connectivity>".
+_auto_backend_choices: Dict[str, Dict[str, Any]] = {}
+_auto_backend_cache_path: Optional[Path] = None
+_auto_backend_cache_loaded = False
+
+
+def set_auto_backend_cache_path(path: Optional[Union[str, Path]]) -> None:
+    """Persist "auto" backend calibrations to ``path`` (None keeps them in memory).
+
+    Choices already stored in the file are loaded immediately; new calibrations
+    are written back as they happen. Defaults to the file named by the
+    ``IMAGE_UTILS_BACKEND_CACHE`` environment variable, if set.
+    """
+    global _auto_backend_cache_path, _auto_backend_cache_loaded
+    _auto_backend_cache_path = None if path is None else Path(path)
+    _auto_backend_cache_loaded = True
+    if _auto_backend_cache_path is not None and _auto_backend_cache_path.exists():
+        stored = json.loads(_auto_backend_cache_path.read_text(encoding="utf-8"))
+        _auto_backend_choices.update(stored.get("choices", {}))
+
+
+def auto_backend_choices() -> Dict[str, Dict[str, Any]]:
+    """Return a copy of the "auto" decisions made (or loaded) in this process."""
+    return {key: dict(choice) for key, choice in _auto_backend_choices.items()}
+
+
+def clear_auto_backend_choices() -> None:
+    """Forget in-memory "auto" decisions so the next frames recalibrate."""
+    _auto_backend_choices.clear()
+
+
+def seed_auto_backend_choices(choices: Dict[str, Dict[str, Any]]) -> None:
+    """Adopt "auto" decisions from ``auto_backend_choices`` (e.g. of a parent process)."""
+    _auto_backend_choices.update({key: dict(choice) for key, choice in choices.items()})
+
+
+def calibrate_auto_backend(image: ImageSource, *, alpha_threshold: int = 250, connectivity: int = 8) -> str:
+    """Make (or reuse) the "auto" backend decision for frames like ``image`` and return it."""
+    _validate_detection_params(alpha_threshold=alpha_threshold, min_area=1, connectivity=connectivity)
+    alpha, _ = _load_frame(image, need_rgba=False)
+    backend_name, _ = _select_backend("auto", alpha < alpha_threshold, connectivity=connectivity)
+    return backend_name
+
+
+def _select_backend(
+    backend: BackendName,
     mask: np.ndarray,
     *,
-    min_area: int,
     connectivity: int,
-) -> Optional[Dict[str, Any]]:
+) -> Tuple[str, Optional[str]]:
+    """Return the backend to use for ``mask`` and how "auto" picked it."""
+    if backend != "auto":
+        return _resolve_backend(backend), None
+
+    available = _available_backends()
+    if len(available) == 1:
+        return available[0], "only-available"
+
+    if not _auto_backend_cache_loaded and os.environ.get(AUTO_BACKEND_CACHE_ENV):
+        set_auto_backend_cache_path(os.environ[AUTO_BACKEND_CACHE_ENV])
+
+    key = f"{_size_bucket(mask.shape)}:{connectivity}"
+    choice = _auto_backend_choices.get(key)
+    if choice is None or choice.get("backend") not in available:
+        choice = _calibrate_backends(mask, connectivity=connectivity, backends=available)
+        _auto_backend_choices[key] = choice
+        _save_auto_backend_choices()
+    return choice["backend"], "calibrated"
+
+
+def _available_backends() -> List[str]:
+    available = []
+    for backend_name in _backend_order("auto"):
+        try:
+            _resolve_backend(backend_name)  # type: ignore[arg-type]
+        except ImportError:
+            continue
+        available.append(backend_name)
+    return available
+
+
+def _size_bucket(shape: Tuple[int, ...]) -> int:
+    """Bucket frames by pixel count in powers of two."""
+    return int(np.prod(shape)).bit_length()
+
+
+def _calibrate_backends(
+    mask: np.ndarray,
+    *,
+    connectivity: int,
+    backends: List[str],
+    repeats: int = 2,
+) -> Dict[str, Any]:
+    """Time labeling plus selection of ``mask`` on each backend; return the winner."""
+    warmup = np.zeros((8, 8), dtype=bool)
+    timings_ms: Dict[str, float] = {}
+    for backend_name in backends:
+        _LABELERS[backend_name](warmup, connectivity=connectivity)
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            labeling = _LABELERS[backend_name](mask, connectivity=connectivity)
+            _largest_labels(labeling, min_area=1, limit=1)
+            best = min(best, time.perf_counter() - start)
+        timings_ms[backend_name] = round(best * 1000, 3)
+
+    return {
+        "backend": min(timings_ms, key=timings_ms.__getitem__),
+        "shape": list(mask.shape),
+        "timings_ms": timings_ms,
+    }
+
+
+def _save_auto_backend_choices() -> None:
+    if _auto_backend_cache_path is None:
+        return
+    _auto_backend_cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Per-process temp name: worker processes may save concurrently.
+    temp_path = _auto_backend_cache_path.with_name(f"{_auto_backend_cache_path.name}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps({"choices": _auto_backend_choices}, indent=2), encoding="utf-8")
+    temp_path.replace(_auto_backend_cache_path)
+
+
+def _label_components_scipy(mask: np.ndarray, *, connectivity: int) -> Dict[str, Any]:
     from scipy import ndimage
 
     structure = np.ones((3, 3), dtype=np.uint8) if connectivity == 8 else np.array(
@@ -126,82 +1251,234 @@ def _find_largest_component_scipy(
     )
 
     labels, num_labels = ndimage.label(mask, structure=structure)
-    if num_labels == 0:
-        return None
-
-    counts = np.bincount(labels.ravel())
-    if counts.size <= 1:
-        return None
-
-    best_label = 0
-    best_area = 0
-    for label_index in range(1, counts.size):
-        area = int(counts[label_index])
-        if area >= min_area and area > best_area:
-            best_label = label_index
-            best_area = area
-
-    if best_label == 0:
-        return None
-
-    component_mask = labels == best_label
-    ys, xs = np.nonzero(component_mask)
-    x_min = int(xs.min())
-    x_max = int(xs.max())
-    y_min = int(ys.min())
-    y_max = int(ys.max())
-
     return {
-        "bbox": {
-            "x": x_min,
-            "y": y_min,
-            "width": x_max - x_min + 1,
-            "height": y_max - y_min + 1,
-        },
-        "centroid": {
-            "x": float(xs.mean()),
-            "y": float(ys.mean()),
-        },
-        "area": int(component_mask.sum()),
-        "mask": component_mask,
+        "labels": labels,
+        "areas": np.bincount(labels.ravel(), minlength=num_labels + 1),
         "backend": "scipy",
     }
 
 
-def _find_largest_component_opencv(
-    mask: np.ndarray,
-    *,
-    min_area: int,
-    connectivity: int,
-) -> Optional[Dict[str, Any]]:
+def _label_components_opencv(mask: np.ndarray, *, connectivity: int) -> Dict[str, Any]:
     import cv2
 
-    binary = (mask.astype(np.uint8) * 255)
-    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
+    # A bool array viewed as uint8 is already a valid 0/1 binary image.
+    binary = np.ascontiguousarray(mask).view(np.uint8)
+    _, labels, stats, centroids = cv2.connectedComponentsWithStats(
         binary,
         connectivity=connectivity,
         ltype=cv2.CV_32S,
     )
-    if num_labels <= 1:
-        return None
-
-    best_label = 0
-    best_area = 0
-    for label_index in range(1, num_labels):
-        area = int(stats[label_index, cv2.CC_STAT_AREA])
-        if area >= min_area and area > best_area:
-            best_label = label_index
-            best_area = area
-
-    if best_label == 0:
-        return None
-
-    x_min = int(stats[best_label, cv2.CC_STAT_LEFT])
-    y_min = int(stats[best_label, cv2.CC_STAT_TOP])
-    width = int(stats[best_label, cv2.CC_STAT_WIDTH])
-    height = int(stats[best_label, cv2.CC_STAT_HEIGHT])
-    centroid_x, centroid_y = centroids[best_label]
-    component_mask = labels == best_label
+    return {
+        "labels": labels,
+        "areas": stats[:, cv2.CC_STAT_AREA],
+        "boxes": stats[:, :4],
+        "centroids": centroids,
+        "backend": "opencv",
+    }
+
+
+def _label_components_numpy(mask: np.ndarray, *, connectivity: int) -> Dict[str, Any]:
+    """Label components with per-row run-length encoding and vectorized union-find.
+
+    Each maximal horizontal run of transparent pixels is a graph node. Runs in
+    adjacent rows are joined when their column spans overlap (or touch
+    diagonally for 8-connectivity). Components are numbered by their first run,
+    i.e. in raster order like scipy; OpenCV may number them differently, so
+    ties between equal areas can pick another component there. Stats are
+    accumulated per run, so no label image is painted unless a mask is needed.
+    """
+    height, width = mask.shape
+    run_rows, run_starts, run_ends = _mask_runs(mask)
+    num_runs = run_rows.size
+
+    if num_runs == 0:
+        return {
+            "areas": np.zeros(1, dtype=np.int64),
+            "boxes": np.zeros((1, 4), dtype=np.int64),
+            "centroids": np.zeros((1, 2), dtype=np.float64),
+            "runs": (run_rows, run_starts, run_ends, np.zeros(0, dtype=np.int64)),
+            "shape": mask.shape,
+            "backend": "numpy",
+        }
+
+    edge_src, edge_dst = _next_row_edges(run_rows, run_starts, run_ends, width=width, connectivity=connectivity)
+    parent = _union_find_roots(num_runs, edge_src, edge_dst)
+    is_root = parent == np.arange(num_runs)
+    run_labels = np.cumsum(is_root)[parent]
+    num_labels = int(np.count_nonzero(is_root))
+
+    lengths = run_ends - run_starts
+    areas = np.bincount(run_labels, weights=lengths, minlength=num_labels + 1).astype(np.int64)
+    sum_x = np.bincount(run_labels, weights=lengths * (run_starts + run_ends - 1) / 2, minlength=num_labels + 1)
+    sum_y = np.bincount(run_labels, weights=lengths * run_rows, minlength=num_labels + 1)
+
+    x_min = np.full(num_labels + 1, width, dtype=np.int64)
+    x_max = np.zeros(num_labels + 1, dtype=np.int64)
+    y_max = np.zeros(num_labels + 1, dtype=np.int64)
+    np.minimum.at(x_min, run_labels, run_starts)
+    np.maximum.at(x_max, run_labels, run_ends)
+    np.maximum.at(y_max, run_labels, run_rows)
+    y_min = np.zeros(num_labels + 1, dtype=np.int64)
+    y_min[1:] = run_rows[is_root]
+
+    boxes = np.stack([x_min, y_min, x_max - x_min, y_max - y_min + 1], axis=1)
+    boxes[0] = 0
+    centroids = np.zeros((num_labels + 1, 2), dtype=np.float64)
+    centroids[1:, 0] = sum_x[1:] / areas[1:]
+    centroids[1:, 1] = sum_y[1:] / areas[1:]
+
+    return {
+        "areas": areas,
+        "boxes": boxes,
+        "centroids": centroids,
+        "runs": (run_rows, run_starts, run_ends, run_labels),
+        "shape": mask.shape,
+        "backend": "numpy",
+    }
+
+
+def _next_row_edges(
+    run_rows: np.ndarray,
+    run_starts: np.ndarray,
+    run_ends: np.ndarray,
+    *,
+    width: int,
+    connectivity: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (src, dst) run indices for every pair of connected runs in adjacent rows.
+
+    Runs must be disjoint and in raster order. Candidate neighbours in the next
+    row are found with two searchsorted calls over row-major keys: spans [s, e)
+    overlap when s_b < e_a + reach and e_b > s_a - reach.
+    """
+    reach = 1 if connectivity == 8 else 0
+    stride = width + 4
+    start_keys = run_rows * stride + run_starts + 2
+    end_keys = run_rows * stride + run_ends + 2
+    next_row_keys = (run_rows + 1) * stride + 2
+    first = np.searchsorted(end_keys, next_row_keys + run_starts - reach, side="right")
+    stop = np.searchsorted(start_keys, next_row_keys + run_ends + reach, side="left")
+    counts = np.maximum(stop - first, 0)
+
+    edge_src = np.repeat(np.arange(run_rows.size), counts)
+    edge_dst = np.arange(edge_src.size) - np.repeat(np.cumsum(counts) - counts - first, counts)
+    return edge_src, edge_dst
+
+
+def _level_runs(levels: np.ndarray, num_levels: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return (rows, starts, ends, run_levels) of maximal same-level runs with level < num_levels."""
+    height, width = levels.shape
+    padded = np.full((height, width + 1), num_levels, dtype=levels.dtype)
+    padded[:, :width] = levels
+    flat = padded.ravel()
+    # The sentinel column ends every run before its row does.
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    run_starts_flat = np.concatenate(([0], changes))
+    run_starts_flat = run_starts_flat[flat[run_starts_flat] < num_levels]
+    run_ends_flat = changes[np.searchsorted(changes, run_starts_flat, side="right")]
+    run_rows, run_starts = np.divmod(run_starts_flat, width + 1)
+    run_ends = run_ends_flat - run_rows * (width + 1)
+    return run_rows, run_starts, run_ends, flat[run_starts_flat].astype(np.int64)
+
+
+def _mask_runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (rows, starts, ends) of the maximal horizontal runs in raster order."""
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=bool)
+    padded[:, 1:-1] = mask
+    # Transitions alternate start/end within each row of the padded mask.
+    transitions = np.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    run_rows, run_starts = np.divmod(transitions[0::2], width + 1)
+    run_ends = transitions[1::2] - run_rows * (width + 1)
+    return run_rows, run_starts, run_ends
+
+
+def _union_find_roots(num_nodes: int, edge_src: np.ndarray, edge_dst: np.ndarray) -> np.ndarray:
+    """Return, for every node, the smallest node index in its connected component.
+
+    Roots are hooked onto the smaller root across each unmerged edge, then paths
+    are fully compressed by pointer jumping; edges that already share a root are
+    dropped between rounds.
+    """
+    parent = np.arange(num_nodes)
+    while edge_src.size:
+        root_src = parent[edge_src]
+        root_dst = parent[edge_dst]
+        unmerged = root_src != root_dst
+        if not unmerged.any():
+            break
+        edge_src = edge_src[unmerged]
+        edge_dst = edge_dst[unmerged]
+        root_src = root_src[unmerged]
+        root_dst = root_dst[unmerged]
+        np.minimum.at(parent, np.maximum(root_src, root_dst), np.minimum(root_src, root_dst))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
+
+
+_LABELERS = {
+    "scipy": _label_components_scipy,
+    "opencv": _label_components_opencv,
+    "numpy": _label_components_numpy,
+}
+
+
+def _largest_labels(labeling: Dict[str, Any], *, min_area: int, limit: int) -> List[int]:
+    """Return up to ``limit`` labels with area >= min_area, largest first.
+
+    Ties resolve to the lowest label, i.e. the component seen first in raster order.
+    """
+    areas = labeling["areas"]
+    if limit == 1:
+        eligible = np.where(areas[1:] >= min_area, areas[1:], 0)
+        if eligible.size == 0 or not eligible.any():
+            return []
+        chosen = [int(np.argmax(eligible)) + 1]
+    else:
+        candidates = np.flatnonzero(areas[1:] >= min_area) + 1
+        order = np.lexsort((candidates, -areas[candidates].astype(np.int64)))
+        chosen = [int(label) for label in candidates[order[:limit]]]
+
+    if chosen and "boxes" not in labeling:
+        _add_boxes_from_labels(labeling, max_label=max(chosen))
+    return chosen
+
+
+def _add_boxes_from_labels(labeling: Dict[str, Any], *, max_label: int) -> None:
+    """Fill ``labeling["boxes"]`` (x, y, width, height) for labels up to ``max_label``."""
+    from scipy import ndimage
+
+    boxes = np.zeros((max_label + 1, 4), dtype=np.int64)
+    for label, found in enumerate(ndimage.find_objects(labeling["labels"], max_label=max_label), start=1):
+        if found is not None:
+            rows, cols = found
+            boxes[label] = (cols.start, rows.start, cols.stop - cols.start, rows.stop - rows.start)
+    labeling["boxes"] = boxes
+
+
+def _describe_component(labeling: Dict[str, Any], label: int) -> Dict[str, Any]:
+    """Compute bbox, centroid and area for one label without a full-frame mask.
+
+    Boxes come from the backend (or ``find_objects`` for scipy). Backends that
+    report centroids are read directly; otherwise the centroid comes from
+    row/column sums of a mask cropped to the bbox.
+    """
+    area = int(labeling["areas"][label])
+    x_min, y_min, width, height = (int(v) for v in labeling["boxes"][label])
+
+    if "centroids" in labeling:
+        centroid_x, centroid_y = (float(v) for v in labeling["centroids"][label])
+    else:
+        labels = labeling["labels"]
+        local = labels[y_min : y_min + height, x_min : x_min + width] == label
+        row_counts = np.count_nonzero(local, axis=1)
+        col_counts = np.count_nonzero(local, axis=0)
+        centroid_x = x_min + float(np.dot(col_counts, np.arange(width))) / area
+        centroid_y = y_min + float(np.dot(row_counts, np.arange(height))) / area
 
     return {
         "bbox": {
@@ -211,27 +1488,402 @@ def _find_largest_component_opencv(
             "height": height,
         },
         "centroid": {
-            "x": float(centroid_x),
-            "y": float(centroid_y),
+            "x": centroid_x,
+            "y": centroid_y,
         },
-        "area": int(best_area),
-        "mask": component_mask,
-        "backend": "opencv",
+        "area": area,
+        "backend": labeling["backend"],
+        "labeling": labeling,
+        "label": label,
     }
 
 
-def _write_overlay_image(rgba: np.ndarray, component_mask: np.ndarray, output_path: Path) -> None:
+def _component_crop(selected: Dict[str, Any]) -> np.ndarray:
+    """Return the boolean mask of a selected component cropped to its bbox."""
+    labeling = selected["labeling"]
+    bbox = selected["bbox"]
+    x0, y0 = selected.get("offset", (0, 0))
+    left, top = bbox["x"] - x0, bbox["y"] - y0
+    width, height = bbox["width"], bbox["height"]
+
+    if "labels" in labeling:
+        return labeling["labels"][top : top + height, left : left + width] == selected["label"]
+
+    run_rows, run_starts, run_ends, run_labels = labeling["runs"]
+    in_component = run_labels == selected["label"]
+    return _paint_runs(
+        run_rows[in_component] - top,
+        run_starts[in_component] - left,
+        run_ends[in_component] - left,
+        (height, width),
+    )
+
+
+def _labels_image(labeling: Dict[str, Any]) -> np.ndarray:
+    """Return the label image of a labeling, painting it from runs if needed."""
+    if "labels" not in labeling:
+        run_rows, run_starts, run_ends, run_labels = labeling["runs"]
+        height, width = labeling["shape"]
+        steps = np.zeros(height * (width + 1) + 1, dtype=np.int32)
+        steps[run_rows * (width + 1) + run_starts] = run_labels
+        steps[run_rows * (width + 1) + run_ends] = -run_labels
+        painted = np.cumsum(steps[:-1], dtype=np.int32).reshape(height, width + 1)
+        labeling["labels"] = painted[:, :width]
+    return labeling["labels"]
+
+
+def _paint_runs(
+    run_rows: np.ndarray,
+    run_starts: np.ndarray,
+    run_ends: np.ndarray,
+    shape: Tuple[int, int],
+) -> np.ndarray:
+    """Rasterize maximal horizontal runs into a boolean mask via a cumulative sum."""
+    height, width = shape
+    # One spare column per row keeps a run ending at the right edge from
+    # cancelling a run that starts the next row.
+    steps = np.zeros(height * (width + 1) + 1, dtype=np.int8)
+    steps[run_rows * (width + 1) + run_starts] = 1
+    steps[run_rows * (width + 1) + run_ends] = -1
+    painted = np.cumsum(steps[:-1], dtype=np.int8).reshape(height, width + 1)
+    return painted[:, :width].view(bool)
+
+
+def _find_components_banded(
+    alpha: np.ndarray,
+    *,
+    alpha_threshold: int,
+    min_area: int,
+    backend_name: str,
+    connectivity: int,
+    limit: int,
+    band_height: int,
+) -> List[Dict[str, Any]]:
+    """Label ``alpha < alpha_threshold`` band by band and merge components across seams.
+
+    Each band is labeled on its own and reduced to per-run label ids, numbered
+    globally in raster order of first appearance. Only per-label stats (area,
+    bbox extents, coordinate sums) and the label ids of the band's last row are
+    kept, so memory is bounded by the band plus a few integers per label. Labels
+    touching across a seam are joined with ``_union_find_roots``, whose roots are
+    the smallest ids, i.e. the component's first appearance in raster order.
+    """
+    height, width = alpha.shape
+    band_stats: List[np.ndarray] = []
+    seam_src: List[np.ndarray] = []
+    seam_dst: List[np.ndarray] = []
+    previous_row: Optional[np.ndarray] = None
+    next_id = 1
+
+    for top in range(0, height, band_height):
+        mask = alpha[top : top + band_height] < alpha_threshold
+        labeling = _LABELERS[backend_name](mask, connectivity=connectivity)
+        if "runs" in labeling:
+            rows, starts, ends, local_labels = labeling["runs"]
+        else:
+            rows, starts, ends = _mask_runs(mask)
+            local_labels = labeling["labels"][rows, starts]
+
+        first_label, first_run = np.unique(local_labels, return_index=True)
+        rank = np.zeros(int(first_label.max(initial=0)) + 1, dtype=np.int64)
+        rank[first_label[np.argsort(first_run)]] = np.arange(first_label.size)
+        ids = rank[local_labels]
+        count = first_label.size
+
+        lengths = ends - starts
+        stats = np.empty((7, count), dtype=np.int64)
+        stats[0] = np.bincount(ids, weights=lengths, minlength=count)
+        stats[1] = np.bincount(ids, weights=lengths * (starts + ends - 1) // 2, minlength=count)
+        stats[2] = np.bincount(ids, weights=lengths * (rows + top), minlength=count)
+        stats[3] = width
+        stats[4] = 0
+        np.minimum.at(stats[3], ids, starts)
+        np.maximum.at(stats[4], ids, ends)
+        stats[5] = top + rows[np.sort(first_run)]
+        stats[6] = 0
+        np.maximum.at(stats[6], ids, rows + top + 1)
+        band_stats.append(stats)
+
+        ids = ids + next_id
+        first_row = _paint_row(ids, rows == 0, starts, ends, width)
+        if previous_row is not None:
+            for shift in range(-1, 2) if connectivity == 8 else (0,):
+                above = np.roll(previous_row, shift)
+                if shift == 1:
+                    above[0] = 0
+                elif shift == -1:
+                    above[-1] = 0
+                touching = (first_row > 0) & (above > 0)
+                seam_src.append(first_row[touching])
+                seam_dst.append(above[touching])
+        previous_row = _paint_row(ids, rows == mask.shape[0] - 1, starts, ends, width)
+        next_id += count
+
+    if next_id == 1:
+        return []
+    stats = np.concatenate([np.zeros((7, 1), dtype=np.int64)] + band_stats, axis=1)
+    roots = _union_find_roots(
+        next_id,
+        np.concatenate(seam_src) if seam_src else np.zeros(0, dtype=np.int64),
+        np.concatenate(seam_dst) if seam_dst else np.zeros(0, dtype=np.int64),
+    )
+    merged = np.zeros_like(stats)
+    for index in range(3):
+        merged[index] = np.bincount(roots, weights=stats[index], minlength=next_id)
+    merged[3] = width
+    np.minimum.at(merged[3], roots, stats[3])
+    np.maximum.at(merged[4], roots, stats[4])
+    merged[5] = height
+    np.minimum.at(merged[5], roots, stats[5])
+    np.maximum.at(merged[6], roots, stats[6])
+    merged[:, 0] = 0
+
+    area, sum_x, sum_y, x_min, x_max, y_min, y_max = merged
+    labeling = {"areas": area, "boxes": np.stack([x_min, y_min, x_max - x_min, y_max - y_min], axis=1)}
+    components = []
+    for label in _largest_labels(labeling, min_area=min_area, limit=limit):
+        label_area = int(area[label])
+        if backend_name == "scipy":
+            # Same arithmetic as _describe_component's bbox-local sums.
+            centroid_x = int(x_min[label]) + float(sum_x[label] - x_min[label] * label_area) / label_area
+            centroid_y = int(y_min[label]) + float(sum_y[label] - y_min[label] * label_area) / label_area
+        else:
+            centroid_x = float(sum_x[label]) / label_area
+            centroid_y = float(sum_y[label]) / label_area
+        x, y, box_width, box_height = (int(v) for v in labeling["boxes"][label])
+        components.append(
+            {
+                "bbox": {"x": x, "y": y, "width": box_width, "height": box_height},
+                "centroid": {"x": centroid_x, "y": centroid_y},
+                "area": label_area,
+                "backend": backend_name,
+            }
+        )
+    return components
+
+
+def _paint_row(ids: np.ndarray, in_row: np.ndarray, starts: np.ndarray, ends: np.ndarray, width: int) -> np.ndarray:
+    """Return one row of global label ids (0 where opaque) from that row's runs."""
+    edges = np.zeros(width + 1, dtype=np.int64)
+    np.add.at(edges, starts[in_row], ids[in_row])
+    np.add.at(edges, ends[in_row], -ids[in_row])
+    return np.cumsum(edges[:-1])
+
+
+_LANE_DTYPES = {2: np.uint16, 4: np.uint32, 8: np.uint64}
+
+
+def _find_components_pyramid(
+    mask: np.ndarray,
+    *,
+    min_area: int,
+    backend_name: str,
+    connectivity: int,
+    limit: int,
+    factor: int,
+) -> List[Dict[str, Any]]:
+    """Find the ``limit`` largest components by refining a block-pooled mask.
+
+    A ``factor x factor`` block is transparent at the coarse level if any of its
+    pixels is. Every full-resolution component lies inside exactly one coarse
+    component, whose transparent-pixel count bounds the area of anything inside
+    it. Coarse components are refined at full resolution, largest bound first,
+    inside their bbox and masked to their own blocks, until no remaining bound
+    can displace the current answer. The result therefore equals full-frame
+    labeling, except that ties between equal areas are resolved in raster
+    order, which may differ from one-shot OpenCV labeling.
+    """
+    height, width = mask.shape
+    block_counts = _block_counts(mask, factor)
+    coarse = _LABELERS[backend_name](block_counts > 0, connectivity=connectivity)
+    coarse_labels = _labels_image(coarse)
+    if "boxes" not in coarse:
+        _add_boxes_from_labels(coarse, max_label=len(coarse["areas"]) - 1)
+
+    bounds = np.bincount(coarse_labels.ravel(), weights=block_counts.ravel(), minlength=len(coarse["areas"]))
+    candidates = np.flatnonzero(bounds[1:] >= min_area) + 1
+    candidates = candidates[np.argsort(-bounds[candidates], kind="stable")]
+
+    found: List[Dict[str, Any]] = []
+    for coarse_label in candidates:
+        if len(found) >= limit and found[limit - 1]["area"] > bounds[coarse_label]:
+            break
+
+        bx, by, bw, bh = (int(v) for v in coarse["boxes"][coarse_label])
+        x0, y0 = bx * factor, by * factor
+        x1, y1 = min((bx + bw) * factor, width), min((by + bh) * factor, height)
+        blocks = coarse_labels[by : by + bh, bx : bx + bw] == coarse_label
+        own_blocks = np.repeat(np.repeat(blocks, factor, axis=0), factor, axis=1)[: y1 - y0, : x1 - x0]
+        roi = _LABELERS[backend_name](mask[y0:y1, x0:x1] & own_blocks, connectivity=connectivity)
+
+        for roi_label in _largest_labels(roi, min_area=min_area, limit=limit):
+            component = _describe_component(roi, roi_label)
+            first_y, first_x = _first_pixel(roi, roi_label)
+            component["raster_index"] = (y0 + first_y) * width + (x0 + first_x)
+            _offset_component(component, x0, y0)
+            found.append(component)
+        found.sort(key=lambda c: (-c["area"], c["raster_index"]))
+        del found[limit:]
+
+    return found
+
+
+def _block_counts(mask: np.ndarray, factor: int) -> np.ndarray:
+    """Count transparent pixels in each ``factor x factor`` block of ``mask``.
+
+    Each row is viewed as ``factor``-byte lanes so horizontal sums are a single
+    popcount per lane; partial blocks at the right/bottom edge are zero-padded.
+    """
+    height, width = mask.shape
+    coarse_height, coarse_width = -(-height // factor), -(-width // factor)
+    if width % factor or not mask.flags.c_contiguous:
+        padded = np.zeros((height, coarse_width * factor), dtype=bool)
+        padded[:, :width] = mask
+        mask = padded
+
+    if hasattr(np, "bitwise_count"):
+        lane_counts = np.bitwise_count(mask.view(_LANE_DTYPES[factor]))
+    else:
+        lane_counts = mask.view(np.uint8).reshape(height, coarse_width, factor).sum(axis=2, dtype=np.uint8)
+
+    counts = np.zeros((coarse_height, coarse_width), dtype=np.int32)
+    full_rows = (height // factor) * factor
+    counts[: height // factor] = lane_counts[:full_rows].reshape(height // factor, factor, coarse_width).sum(
+        axis=1, dtype=np.int32
+    )
+    if full_rows < height:
+        counts[-1] = lane_counts[full_rows:].sum(axis=0, dtype=np.int32)
+    return counts
+
+
+def _first_pixel(labeling: Dict[str, Any], label: int) -> Tuple[int, int]:
+    """Return (y, x) of the first pixel of ``label`` in raster order."""
+    if "labels" in labeling:
+        x_min, y_min, width, _ = (int(v) for v in labeling["boxes"][label])
+        top_row = labeling["labels"][y_min, x_min : x_min + width]
+        return y_min, x_min + int(np.argmax(top_row == label))
+
+    run_rows, run_starts, _, run_labels = labeling["runs"]
+    first_run = int(np.argmax(run_labels == label))
+    return int(run_rows[first_run]), int(run_starts[first_run])
+
+
+def _offset_component(component: Dict[str, Any], x0: int, y0: int) -> None:
+    """Translate a component described inside an ROI back to frame coordinates."""
+    component["bbox"]["x"] += x0
+    component["bbox"]["y"] += y0
+    component["centroid"]["x"] += x0
+    component["centroid"]["y"] += y0
+    component["offset"] = (x0, y0)
+
+
+def _labels_on_edges(
+    labeling: Dict[str, Any],
+    *,
+    top: bool,
+    bottom: bool,
+    left: bool,
+    right: bool,
+) -> np.ndarray:
+    """Return the distinct nonzero labels touching the selected image edges."""
+    if "labels" in labeling:
+        labels = labeling["labels"]
+        edges = [np.zeros(0, dtype=labels.dtype)]
+        if top:
+            edges.append(labels[0])
+        if bottom:
+            edges.append(labels[-1])
+        if left:
+            edges.append(labels[:, 0])
+        if right:
+            edges.append(labels[:, -1])
+        found = np.unique(np.concatenate(edges))
+    else:
+        run_rows, run_starts, run_ends, run_labels = labeling["runs"]
+        height, width = labeling["shape"]
+        touching = np.zeros(run_rows.size, dtype=bool)
+        if top:
+            touching |= run_rows == 0
+        if bottom:
+            touching |= run_rows == height - 1
+        if left:
+            touching |= run_starts == 0
+        if right:
+            touching |= run_ends == width
+        found = np.unique(run_labels[touching])
+    return found[found != 0]
+
+
+def _write_component_outputs(
+    selected: Dict[str, Any],
+    shape: Tuple[int, int],
+    *,
+    rgba: Optional[np.ndarray],
+    overlay_output_path: Optional[Union[str, Path]],
+    mask_output_path: Optional[Union[str, Path]],
+    overlay_region: OverlayRegion = "full",
+    overlay_downscale: int = 1,
+) -> None:
+    if overlay_output_path is None and mask_output_path is None:
+        return
+
+    # Outputs are built from the bbox crop; no full-frame bool mask is needed.
+    crop = _component_crop(selected)
+    if overlay_output_path is not None:
+        assert rgba is not None
+        _write_overlay_image(
+            rgba,
+            selected["bbox"],
+            crop,
+            Path(overlay_output_path),
+            region=overlay_region,
+            downscale=overlay_downscale,
+        )
+    if mask_output_path is not None:
+        mask_path = Path(mask_output_path)
+        bbox = selected["bbox"]
+        if mask_path.suffix.lower() == ".npz":
+            _save_mask_npz_crop(mask_path, crop, (bbox["x"], bbox["y"]), shape)
+        else:
+            _write_mask_image(crop, bbox, shape, mask_path)
+
+
+def _write_overlay_image(
+    rgba: np.ndarray,
+    bbox: Dict[str, int],
+    crop: np.ndarray,
+    output_path: Path,
+    *,
+    region: OverlayRegion = "full",
+    downscale: int = 1,
+) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    overlay = rgba.copy().astype(np.float32)
+    rows = slice(bbox["y"], bbox["y"] + bbox["height"])
+    cols = slice(bbox["x"], bbox["x"] + bbox["width"])
+    if region == "bbox":
+        overlay = np.array(rgba[rows, cols], dtype=np.uint8)
+        target = overlay
+    else:
+        overlay = np.array(rgba, dtype=np.uint8)
+        target = overlay[rows, cols]
+
+    # Blend selected region toward bright green for quick visual debugging:
+    # 0.35 * pixel + 0.65 * green, in integer math and only inside the bbox.
+    rgb = target[:, :, :3]
+    blended = rgb.astype(np.uint16) * 7
+    blended[:, :, 1] += 255 * 13
+    blended //= 20
+    np.copyto(rgb, blended, casting="unsafe", where=crop[:, :, None])
 
-    # Blend selected region toward bright green for quick visual debugging.
-    green = np.array([0, 255, 0], dtype=np.float32)
-    overlay[component_mask, :3] = 0.35 * overlay[component_mask, :3] + 0.65 * green
-    overlay_image = np.clip(overlay, 0, 255).astype(np.uint8)
-    Image.fromarray(overlay_image, mode="RGBA").save(output_path)
+    overlay_image = Image.fromarray(overlay, mode="RGBA")
+    if downscale > 1:
+        overlay_image = overlay_image.reduce(downscale)
+    overlay_image.save(output_path)
 
 
-def _write_mask_image(component_mask: np.ndarray, output_path: Path) -> None:
+def _write_mask_image(crop: np.ndarray, bbox: Dict[str, int], shape: Tuple[int, int], output_path: Path) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    mask_image = (component_mask.astype(np.uint8) * 255)
-    Image.fromarray(mask_image, mode="L").save(output_path)
\ No newline at end of file
+    mask_image = np.zeros(shape, dtype=np.uint8)
+    region = mask_image[bbox["y"] : bbox["y"] + bbox["height"], bbox["x"] : bbox["x"] + bbox["width"]]
+    region[crop] = 255
+    Image.fromarray(mask_image, mode="L").save(output_path)
@@ -8,17 +8,48 @@ pipeline by scanning frame PNGs and writing one JSON metadata file per frame.
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
 
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from image_utils import detect_primary_transparent_hole
+from alpha_stack import load_alpha_stack
+from detection_cache import (
+    DEFAULT_MAX_BYTES,
+    DETECTION_VERSION,
+    DetectionCache,
+    backend_version,
+    format_cache_stats,
+)
+from image_utils import (
+    TransparentHoleTracker,
+    auto_backend_choices,
+    calibrate_auto_backend,
+    clear_stage_timings,
+    detect_primary_transparent_hole,
+    iter_image_frames,
+    record_stage_timings,
+    seed_auto_backend_choices,
+    set_auto_backend_cache_path,
+    stage_timing_samples,
+    stage_timing_summary,
+)
+from metadata_bundle import BUNDLE_NAME, read_metadata_bundle, write_asset_index, write_metadata_bundle
+from transparency_index import TransparencyIndex
 
 
 def _frame_sort_key(path: Path) -> tuple[int, str]:
@@ -29,6 +60,243 @@ def _frame_sort_key(path: Path) -> tuple[int, str]:
         return (10**9, stem)
 
 
+def _frame_content(frame_source: Union[Path, np.ndarray, Image.Image]) -> bytes:
+    """Bytes that identify a frame's pixels for the detection cache."""
+    if isinstance(frame_source, np.ndarray):
+        return frame_source.tobytes()
+    if isinstance(frame_source, Image.Image):
+        # Palette frames take their alpha from the palette and "transparency", not the pixels.
+        palette = bytes(frame_source.getpalette(rawmode=None) or [])
+        header = f"{frame_source.mode}:{frame_source.size}:{frame_source.info.get('transparency')!r}:"
+        return header.encode("ascii") + palette + b":" + frame_source.tobytes()
+    return frame_source.read_bytes()
+
+
+FrameSource = Union[Path, np.ndarray, Image.Image]
+
+# Written next to the frame JSON; records what each frame's outputs were built from.
+MANIFEST_NAME = "__manifest__.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class _FrameJob:
+    """One frame on its way through detection, in output order."""
+
+    output_index: int
+    frame_name: str
+    frame_source: FrameSource
+    overlay_path: Optional[Path]
+    mask_path: Optional[Path]
+    index_path: Optional[Path]
+    cache_key: Optional[str]
+    detect: bool
+    result: Optional[Dict[str, Any]] = None
+    # Set for frames whose outputs are up to date: their existing JSON payload.
+    payload: Optional[Dict[str, Any]] = None
+    manifest_entry: Optional[Dict[str, Any]] = None
+
+
+def _process_frame(
+    frame_source: FrameSource,
+    *,
+    detect: bool,
+    overlay_path: Optional[Path],
+    mask_path: Optional[Path],
+    index_path: Optional[Path],
+    detect_kwargs: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    """Detect one frame (unless its result came from the cache) and write its transparency index."""
+    result = None
+    if detect:
+        result = detect_primary_transparent_hole(
+            frame_source,
+            overlay_output_path=overlay_path,
+            mask_output_path=mask_path,
+            **detect_kwargs,
+        )
+    if index_path is not None:
+        TransparencyIndex.from_image(frame_source, alpha_threshold=detect_kwargs["alpha_threshold"]).save(index_path)
+    return result
+
+
+# Worker-process state, set up once per worker by ``_init_worker``.
+_worker_stack: Optional[np.ndarray] = None
+
+
+def _init_worker(alpha_stack: Optional[Path], backend_choices: Dict[str, Dict[str, Any]]) -> None:
+    global _worker_stack
+    if alpha_stack is not None:
+        _worker_stack, _ = load_alpha_stack(alpha_stack)
+    # Start from the parent's "auto" calibrations so workers do not each calibrate full frames.
+    seed_auto_backend_choices(backend_choices)
+
+
+def _process_chunk(
+    tasks: List[Tuple[Any, bool, Optional[Path], Optional[Path], Optional[Path]]],
+    detect_kwargs: Dict[str, Any],
+) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, List[float]]]:
+    """Worker entry point: process a chunk of frames and return their results and stage timings."""
+    clear_stage_timings()
+    results = []
+    for frame_ref, detect, overlay_path, mask_path, index_path in tasks:
+        if not detect and index_path is None:
+            results.append(None)
+            continue
+        # Alpha stack frames travel as row numbers into the worker's own memmap.
+        frame_source = _worker_stack[frame_ref] if isinstance(frame_ref, int) else frame_ref
+        results.append(
+            _process_frame(
+                frame_source,
+                detect=detect,
+                overlay_path=overlay_path,
+                mask_path=mask_path,
+                index_path=index_path,
+                detect_kwargs=detect_kwargs,
+            )
+        )
+    return results, stage_timing_samples()
+
+
+def _calibrate_in_parent(jobs: List[_FrameJob], detect_kwargs: Dict[str, Any]) -> None:
+    """Make the "auto" backend decision for full frames once, before workers start."""
+    for job in jobs:
+        if job.detect:
+            try:
+                calibrate_auto_backend(
+                    job.frame_source,
+                    alpha_threshold=detect_kwargs["alpha_threshold"],
+                    connectivity=detect_kwargs["connectivity"],
+                )
+            except Exception:
+                pass  # a broken frame is reported by its worker, in frame order
+            return
+
+
+def _run_in_pool(
+    jobs: Iterator[_FrameJob],
+    *,
+    workers: int,
+    chunk_size: int,
+    detect_kwargs: Dict[str, Any],
+    alpha_stack: Optional[Path],
+) -> Iterator[_FrameJob]:
+    """Detect ``jobs`` on a process pool, yielding them in input order with results filled in.
+
+    Jobs are submitted ``chunk_size`` at a time with at most two chunks per
+    worker in flight, so streamed frames are never all held in memory. If a
+    chunk fails it is re-run in this process, which yields the frames before the
+    failing one and then raises the same error the sequential path would.
+    """
+    first_chunk = list(islice(jobs, chunk_size))
+    if detect_kwargs["backend"] == "auto":
+        _calibrate_in_parent(first_chunk, detect_kwargs)
+    pending: Deque[Tuple[List[_FrameJob], "Future[Any]"]] = deque()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(alpha_stack, auto_backend_choices()),
+    )
+
+    def finish(chunk: List[_FrameJob], future: "Future[Any]") -> Iterator[_FrameJob]:
+        try:
+            results, samples = future.result()
+        except Exception:
+            pool.shutdown(wait=False, cancel_futures=True)
+            for job in chunk:
+                result = _process_frame(
+                    job.frame_source,
+                    detect=job.detect,
+                    overlay_path=job.overlay_path,
+                    mask_path=job.mask_path,
+                    index_path=job.index_path,
+                    detect_kwargs=detect_kwargs,
+                )
+                if job.detect:
+                    job.result = result
+                yield job
+            raise
+        record_stage_timings(samples)
+        for job, result in zip(chunk, results):
+            if job.detect:
+                job.result = result
+            yield job
+
+    try:
+        for chunk in chain([first_chunk], iter(lambda: list(islice(jobs, chunk_size)), [])):
+            if not chunk:
+                break
+            tasks = [
+                (
+                    job.output_index if alpha_stack is not None else job.frame_source,
+                    job.detect,
+                    job.overlay_path,
+                    job.mask_path,
+                    job.index_path,
+                )
+                for job in chunk
+            ]
+            pending.append((chunk, pool.submit(_process_chunk, tasks, detect_kwargs)))
+            if len(pending) >= 2 * workers:
+                yield from finish(*pending.popleft())
+        while pending:
+            yield from finish(*pending.popleft())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _read_manifest(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Return the manifest's per-frame entries, or none if it is missing, unreadable or outdated."""
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return dict(manifest.get("frames", {}))
+
+
+def _write_manifest(path: Path, frames: Dict[str, Dict[str, Any]]) -> None:
+    data = json.dumps({"version": MANIFEST_VERSION, "frames": dict(sorted(frames.items()))}, indent=1)
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text(data, encoding="utf-8")
+    temp_path.replace(path)
+
+
+def _frame_fingerprint(frame_path: Path, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Size, mtime and content hash of a frame file.
+
+    The file is only read and hashed when its size or mtime differ from
+    ``previous``, so untouched frames cost one ``stat``.
+    """
+    stat = frame_path.stat()
+    fingerprint: Dict[str, Any] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous is not None and all(previous.get(name) == value for name, value in fingerprint.items()):
+        fingerprint["hash"] = previous.get("hash")
+    else:
+        fingerprint["hash"] = hashlib.blake2b(frame_path.read_bytes(), digest_size=20).hexdigest()
+    return fingerprint
+
+
+def _params_digest(params: Dict[str, Any]) -> str:
+    description = {**params, "backend_version": backend_version(str(params["backend"]))}
+    description["detection_version"] = DETECTION_VERSION
+    return hashlib.blake2b(json.dumps(description, sort_keys=True).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _prune_frame_outputs(output_dir: Path, frame_name: str) -> None:
+    """Delete every output written for a frame that no longer exists."""
+    candidates = [
+        output_dir / f"{frame_name}.json",
+        output_dir / "debug_overlay" / f"{frame_name}.png",
+        output_dir / "debug_mask" / f"{frame_name}.png",
+        output_dir / "debug_mask" / f"{frame_name}.npz",
+        output_dir / "transparency_index" / f"{frame_name}.npz",
+    ]
+    for path in candidates:
+        path.unlink(missing_ok=True)
+
+
 def _bbox_xyxy(bbox: Dict[str, int]) -> List[int]:
     x = int(bbox["x"])
     y = int(bbox["y"])
@@ -37,6 +305,40 @@ def _bbox_xyxy(bbox: Dict[str, int]) -> List[int]:
     return [x, y, x + width, y + height]
 
 
+def _frame_payload(
+    frame_name: str,
+    output_index: int,
+    result: Optional[Dict[str, Any]],
+    *,
+    inline_mask_rle: bool,
+    polygon_tolerance: Optional[float],
+    inscribed_rect: bool,
+) -> Dict[str, Any]:
+    output_payload: Dict[str, Any] = {
+        "frame_index": int(frame_name.split("_")[-1]),
+        "output_index": output_index,
+    }
+
+    if result is None:
+        output_payload["bbox"] = None
+        output_payload["has_mask"] = False
+        output_payload["centroid"] = None
+        output_payload["area"] = 0
+    else:
+        output_payload["bbox"] = _bbox_xyxy(result["bbox"])
+        output_payload["has_mask"] = True
+        output_payload["centroid"] = result["centroid"]
+        output_payload["area"] = int(result["area"])
+        output_payload["backend"] = result["backend"]
+        if inline_mask_rle:
+            output_payload["mask_rle"] = result["mask_rle"]
+        if polygon_tolerance is not None:
+            output_payload["polygon"] = result["polygon"]
+        if inscribed_rect:
+            output_payload["inscribed_rect"] = _bbox_xyxy(result["inscribed_rect"])
+    return output_payload
+
+
 def build_frame_hole_metadata(
     *,
     frames_dir: Path,
@@ -46,10 +348,59 @@ def build_frame_hole_metadata(
     backend: str,
     connectivity: int,
     write_debug_images: bool,
+    pyramid_factor: Optional[int] = None,
+    track: bool = False,
+    mask_format: str = "png",
+    inline_mask_rle: bool = False,
+    overlay_region: str = "full",
+    overlay_downscale: int = 1,
+    polygon_tolerance: Optional[float] = None,
+    cache: Optional[DetectionCache] = None,
+    alpha_stack: Optional[Path] = None,
+    container: Optional[Path] = None,
+    band_height: Optional[int] = None,
+    timings: bool = False,
+    write_transparency_index: bool = False,
+    inscribed_rect: bool = False,
+    workers: int = 1,
+    chunk_size: int = 8,
+    incremental: bool = True,
+    output_format: str = "files",
+    frame_paths: Optional[Sequence[Path]] = None,
 ) -> None:
+    """Detect the hole in every frame and write ``<frame>.json`` into ``output_dir``.
+
+    For ``f_*.png`` frames read from ``frames_dir``, ``incremental`` keeps a
+    manifest of each frame's size, mtime, content hash and build parameters, so
+    a rerun only detects frames that are new, changed or were built with other
+    parameters, rewrites JSON whose ``output_index`` moved, and deletes the
+    outputs of frames that were removed. Alpha stack and container input is
+    always processed in full.
+
+    ``output_format`` chooses between per-frame JSON (``"files"``), one
+    columnar ``__bundle__.json`` for the whole sequence (``"bundle"``, see
+    ``metadata_bundle``) or both. Writing a bundle from ``f_*.png`` frames also
+    rewrites ``frames_dir/__index__.json`` to list the same frames.
+
+    ``frame_paths`` replaces the ``f_*.png`` glob of ``frames_dir`` with an
+    explicit list of frame files.
+    """
+    if output_format not in ("files", "bundle", "both"):
+        raise ValueError(f"Unsupported output_format: {output_format}")
+    write_files = output_format != "bundle"
+    write_bundle = output_format != "files"
+    if band_height is not None and track:
+        raise ValueError("band_height cannot be combined with tracking")
+    if workers < 1 or chunk_size < 1:
+        raise ValueError("workers and chunk_size must be >= 1")
+    if workers > 1 and track:
+        raise ValueError("tracking follows the hole from frame to frame and cannot run on multiple workers")
     frames_dir = frames_dir.resolve()
     output_dir = output_dir.resolve()
     output_dir.mkdir(parents=True, exist_ok=True)
+    if not write_bundle:
+        # The player prefers the bundle, so a stale one would hide this run's JSON.
+        (output_dir / BUNDLE_NAME).unlink(missing_ok=True)
 
     debug_overlay_dir: Optional[Path] = None
     debug_mask_dir: Optional[Path] = None
@@ -58,59 +409,352 @@ def build_frame_hole_metadata(
         debug_mask_dir = output_dir / "debug_mask"
         debug_overlay_dir.mkdir(parents=True, exist_ok=True)
         debug_mask_dir.mkdir(parents=True, exist_ok=True)
+    index_dir: Optional[Path] = None
+    if write_transparency_index:
+        index_dir = output_dir / "transparency_index"
+        index_dir.mkdir(parents=True, exist_ok=True)
 
-    frame_paths = sorted(frames_dir.glob("f_*.png"), key=_frame_sort_key)
-    if not frame_paths:
-        raise FileNotFoundError(f"No frame PNGs found in {frames_dir}")
+    # Each frame is read from its PNG, from a row of a pre-decoded alpha stack, or
+    # streamed one at a time out of a multi-frame container.
+    frames: Iterable[tuple[str, Union[Path, np.ndarray, Image.Image]]]
+    if container is not None:
+        frames = ((f"f_{index:04d}", frame) for index, frame in enumerate(iter_image_frames(container)))
+    elif alpha_stack is not None:
+        stack, frame_names = load_alpha_stack(alpha_stack)
+        misnamed = [frame_name for frame_name in frame_names if not frame_name.split("_")[-1].isdigit()]
+        if misnamed:
+            raise ValueError(
+                f"{alpha_stack} holds frames not named f_<number> (e.g. {misnamed[0]!r}); "
+                "rebuild it from f_*.png frames with alpha_stack.py --pattern 'f_*.png'"
+            )
+        frames = [(frame_name, stack[index]) for index, frame_name in enumerate(frame_names)]
+    else:
+        if frame_paths is None:
+            frame_paths = frames_dir.glob("f_*.png")
+        frame_paths = sorted(frame_paths, key=_frame_sort_key)
+        # With a manifest, an empty frame set is a valid state: every frame was removed.
+        if not frame_paths and not (incremental and _read_manifest(output_dir / MANIFEST_NAME)):
+            raise FileNotFoundError(f"No frame PNGs found in {frames_dir}")
+        frames = [(frame_path.stem, frame_path) for frame_path in frame_paths]
 
-    total = len(frame_paths)
-    hits = 0
+    manifest_path = output_dir / MANIFEST_NAME
+    manifest: Optional[Dict[str, Dict[str, Any]]] = None
+    params_digest = ""
+    previous_bundle: Dict[str, Dict[str, Any]] = {}
+    if incremental and container is None and alpha_stack is None:
+        manifest = _read_manifest(manifest_path)
+        if not write_files:
+            # Without per-frame JSON, unchanged frames take their payload from the last bundle.
+            previous_bundle = read_metadata_bundle(output_dir)
+        params_digest = _params_digest(
+            dict(
+                alpha_threshold=alpha_threshold,
+                min_area=min_area,
+                backend=backend,
+                connectivity=connectivity,
+                pyramid_factor=pyramid_factor,
+                track=track,
+                band_height=band_height,
+                inline_mask_rle=inline_mask_rle,
+                polygon_tolerance=polygon_tolerance,
+                inscribed_rect=inscribed_rect,
+                write_debug_images=write_debug_images,
+                mask_format=mask_format,
+                overlay_region=overlay_region,
+                overlay_downscale=overlay_downscale,
+                write_transparency_index=write_transparency_index,
+                output_format=output_format,
+            )
+        )
+
+    detect_kwargs: Dict[str, Any] = dict(
+        alpha_threshold=alpha_threshold,
+        min_area=min_area,
+        backend=backend,
+        connectivity=connectivity,
+        overlay_region=overlay_region,
+        overlay_downscale=overlay_downscale,
+        pyramid_factor=pyramid_factor,
+        mask_rle=inline_mask_rle,
+        contour_tolerance=polygon_tolerance,
+        band_height=band_height,
+        timings=timings,
+        inscribed_rect=inscribed_rect,
+    )
 
-    for output_index, frame_path in enumerate(frame_paths):
-        frame_name = frame_path.stem
-        frame_index = int(frame_name.split("_")[-1])
+    def frame_jobs() -> Iterator[_FrameJob]:
+        for output_index, (frame_name, frame_source) in enumerate(frames):
+            if workers > 1 and isinstance(frame_source, Image.Image):
+                # Container frames are reused by the iterator; snapshot them for the pool.
+                frame_source = frame_source.copy()
 
-        overlay_path = None
-        mask_path = None
-        if write_debug_images and debug_overlay_dir and debug_mask_dir:
-            overlay_path = debug_overlay_dir / f"{frame_name}.png"
-            mask_path = debug_mask_dir / f"{frame_name}.png"
+            manifest_entry = None
+            if manifest is not None and isinstance(frame_source, Path):
+                previous = manifest.get(frame_name)
+                manifest_entry = {**_frame_fingerprint(frame_source, previous), "params": params_digest}
+                payload = None
+                if (
+                    previous is not None
+                    and previous.get("hash") == manifest_entry["hash"]
+                    and previous.get("params") == params_digest
+                ):
+                    if write_files:
+                        try:
+                            payload = json.loads((output_dir / f"{frame_name}.json").read_text(encoding="utf-8"))
+                        except (OSError, ValueError):
+                            payload = None
+                    else:
+                        payload = previous_bundle.get(frame_name)
+                if payload is not None:
+                    yield _FrameJob(
+                        output_index=output_index,
+                        frame_name=frame_name,
+                        frame_source=frame_source,
+                        overlay_path=None,
+                        mask_path=None,
+                        index_path=None,
+                        cache_key=None,
+                        detect=False,
+                        payload=payload,
+                        manifest_entry=manifest_entry,
+                    )
+                    continue
 
-        result = detect_primary_transparent_hole(
-            frame_path,
+            overlay_path = None
+            mask_path = None
+            if write_debug_images and debug_overlay_dir and debug_mask_dir:
+                overlay_path = debug_overlay_dir / f"{frame_name}.png"
+                mask_path = debug_mask_dir / f"{frame_name}.{mask_format}"
+
+            found = False
+            result = None
+            cache_key = None
+            if cache is not None:
+                cache_key = cache.key(
+                    _frame_content(frame_source),
+                    alpha_threshold=alpha_threshold,
+                    min_area=min_area,
+                    backend=backend,
+                    connectivity=connectivity,
+                    pyramid_factor=None if track else pyramid_factor,
+                    mask_rle=inline_mask_rle,
+                    contour_tolerance=polygon_tolerance,
+                    inscribed_rect=inscribed_rect,
+                )
+                # Debug images are not cached, so frames that need them are always detected.
+                if not write_debug_images:
+                    found, result = cache.get(cache_key)
+
+            yield _FrameJob(
+                output_index=output_index,
+                frame_name=frame_name,
+                frame_source=frame_source,
+                overlay_path=overlay_path,
+                mask_path=mask_path,
+                index_path=None if index_dir is None else index_dir / f"{frame_name}.npz",
+                cache_key=cache_key,
+                detect=not found,
+                result=result,
+                manifest_entry=manifest_entry,
+            )
+
+    tracker: Optional[TransparentHoleTracker] = None
+    if track:
+        tracker = TransparentHoleTracker(
             alpha_threshold=alpha_threshold,
             min_area=min_area,
             backend=backend,
             connectivity=connectivity,
-            overlay_output_path=overlay_path,
-            mask_output_path=mask_path,
         )
 
-        output_payload: Dict[str, object] = {
-            "frame_index": frame_index,
-            "output_index": output_index,
-        }
-
-        if result is None:
-            output_payload["bbox"] = None
-            output_payload["has_mask"] = False
-            output_payload["centroid"] = None
-            output_payload["area"] = 0
-        else:
-            hits += 1
-            output_payload["bbox"] = _bbox_xyxy(result["bbox"])
-            output_payload["has_mask"] = True
-            output_payload["centroid"] = result["centroid"]
-            output_payload["area"] = int(result["area"])
-            output_payload["backend"] = result["backend"]
-
-        output_file = output_dir / f"{frame_name}.json"
-        output_file.write_text(json.dumps(output_payload), encoding="utf-8")
+    def detect_sequentially(jobs: Iterator[_FrameJob]) -> Iterator[_FrameJob]:
+        for job in jobs:
+            if job.detect and tracker is not None:
+                job.result = tracker.detect(
+                    job.frame_source,
+                    overlay_output_path=job.overlay_path,
+                    mask_output_path=job.mask_path,
+                    overlay_region=overlay_region,
+                    overlay_downscale=overlay_downscale,
+                    mask_rle=inline_mask_rle,
+                    contour_tolerance=polygon_tolerance,
+                    timings=timings,
+                    inscribed_rect=inscribed_rect,
+                )
+                _process_frame(
+                    job.frame_source,
+                    detect=False,
+                    overlay_path=None,
+                    mask_path=None,
+                    index_path=job.index_path,
+                    detect_kwargs=detect_kwargs,
+                )
+            else:
+                result = _process_frame(
+                    job.frame_source,
+                    detect=job.detect,
+                    overlay_path=job.overlay_path,
+                    mask_path=job.mask_path,
+                    index_path=job.index_path,
+                    detect_kwargs=detect_kwargs,
+                )
+                if job.detect:
+                    job.result = result
+            yield job
+
+    processed: Iterator[_FrameJob]
+    if workers > 1:
+        processed = _run_in_pool(
+            frame_jobs(),
+            workers=workers,
+            chunk_size=chunk_size,
+            detect_kwargs=detect_kwargs,
+            alpha_stack=alpha_stack,
+        )
+    else:
+        processed = detect_sequentially(frame_jobs())
+
+    # Entries of frames not reached (e.g. after a failure) keep their old
+    # fingerprint, so the next run checks them again.
+    new_manifest = dict(manifest or {})
+    if manifest is None:
+        # A full run without the manifest makes any existing one untrustworthy.
+        manifest_path.unlink(missing_ok=True)
+
+    total = 0
+    hits = 0
+    unchanged = 0
+    removed: List[str] = []
+    bundle_frames: List[Tuple[str, Dict[str, Any]]] = []
+    try:
+        for job in processed:
+            total += 1
+            output_file = output_dir / f"{job.frame_name}.json"
+            if job.payload is not None:
+                unchanged += 1
+                output_payload = job.payload
+                if output_payload["output_index"] != job.output_index:
+                    output_payload["output_index"] = job.output_index
+                    if write_files:
+                        output_file.write_text(json.dumps(output_payload), encoding="utf-8")
+            else:
+                if job.detect and job.cache_key is not None:
+                    cache.put(job.cache_key, job.result)
+                output_payload = _frame_payload(
+                    job.frame_name,
+                    job.output_index,
+                    job.result,
+                    inline_mask_rle=inline_mask_rle,
+                    polygon_tolerance=polygon_tolerance,
+                    inscribed_rect=inscribed_rect,
+                )
+                if write_files:
+                    output_file.write_text(json.dumps(output_payload), encoding="utf-8")
+            if write_bundle:
+                bundle_frames.append((job.frame_name, output_payload))
+            if output_payload["has_mask"]:
+                hits += 1
+            if job.manifest_entry is not None:
+                new_manifest[job.frame_name] = job.manifest_entry
+
+        if manifest is not None:
+            present = {frame_name for frame_name, _ in frames}
+            removed = sorted(frame_name for frame_name in manifest if frame_name not in present)
+            for frame_name in removed:
+                _prune_frame_outputs(output_dir, frame_name)
+                del new_manifest[frame_name]
+
+        if write_bundle:
+            write_metadata_bundle(output_dir, bundle_frames)
+            if container is None and alpha_stack is None:
+                write_asset_index(frames_dir, [f"{frame_name}.png" for frame_name, _ in bundle_frames])
+    finally:
+        if manifest is not None:
+            _write_manifest(manifest_path, new_manifest)
 
     print(
         f"Processed {total} frames. Detected hole in {hits} frames. "
         f"Metadata written to {output_dir}"
     )
+    if manifest is not None:
+        print(f"Incremental: {total - unchanged} frames rebuilt, {unchanged} unchanged, {len(removed)} removed")
+    if cache is not None:
+        print(format_cache_stats(cache.stats()))
+    if timings:
+        _print_stage_timings(stage_timing_summary())
+
+
+def _png_complete(frame_path: Path) -> bool:
+    """Whether a PNG file ends with its IEND chunk, i.e. has been written out in full."""
+    try:
+        with frame_path.open("rb") as handle:
+            handle.seek(-12, 2)
+            return handle.read(12)[4:8] == b"IEND"
+    except OSError:
+        return False
+
+
+def watch_frame_hole_metadata(
+    *,
+    frames_dir: Path,
+    poll_interval: float = 0.5,
+    settle_time: float = 0.5,
+    max_builds: Optional[int] = None,
+    **build_kwargs: Any,
+) -> None:
+    """Keep the metadata of ``frames_dir`` up to date while frames are being written.
+
+    Polls for new, modified and deleted ``f_*.png`` files every
+    ``poll_interval`` seconds and runs an incremental
+    ``build_frame_hole_metadata`` as soon as a change is ready. A frame is ready
+    once its mtime is ``settle_time`` seconds old and the PNG ends with its IEND
+    chunk. New frames still being written are left out of a build until they
+    are ready; a build waits while an already built frame is being rewritten.
+    A failing build is reported and retried after the next change. Runs until
+    interrupted, or for ``max_builds`` builds.
+    """
+    if build_kwargs.get("alpha_stack") is not None or build_kwargs.get("container") is not None:
+        raise ValueError("watch mode reads f_*.png frames from frames_dir")
+    if not build_kwargs.get("incremental", True):
+        raise ValueError("watch mode relies on incremental rebuilds")
+    frames_dir = frames_dir.resolve()
+    built: Optional[Dict[Path, Tuple[int, int]]] = None
+    builds = 0
+    print(f"Watching {frames_dir} for f_*.png frames (Ctrl+C to stop)")
+    while max_builds is None or builds < max_builds:
+        now_ns = time.time_ns()
+        ready: Dict[Path, Tuple[int, int]] = {}
+        waiting = False
+        for frame_path in frames_dir.glob("f_*.png"):
+            try:
+                stat = frame_path.stat()
+            except OSError:
+                continue  # deleted between the glob and the stat
+            state = (stat.st_size, stat.st_mtime_ns)
+            if (built or {}).get(frame_path) == state or (
+                now_ns - stat.st_mtime_ns >= settle_time * 1e9 and _png_complete(frame_path)
+            ):
+                ready[frame_path] = state
+            elif built is not None and frame_path in built:
+                waiting = True
+
+        if ready != built and not waiting and (ready or built):
+            builds += 1
+            try:
+                build_frame_hole_metadata(frames_dir=frames_dir, frame_paths=list(ready), **build_kwargs)
+            except Exception as exc:
+                print(f"Build failed, retrying after the next change: {exc!r}", file=sys.stderr)
+            built = ready
+        time.sleep(poll_interval)
+
+
+def _print_stage_timings(summary: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'stage':<10} {'frames':>6} {'total s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for stage, stats in summary.items():
+        print(
+            f"{stage:<10} {stats['count']:>6} {stats['total']:>9.3f} "
+            f"{stats['p50'] * 1000:>8.2f} {stats['p90'] * 1000:>8.2f} {stats['p99'] * 1000:>8.2f}"
+        )
 
 
 def parse_args() -> argparse.Namespace:
@@ -143,10 +787,16 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--backend",
-        choices=["auto", "scipy", "opencv"],
+        choices=["auto", "scipy", "opencv", "numpy"],
         default="auto",
         help="Connected components backend.",
     )
+    parser.add_argument(
+        "--backend-cache",
+        type=Path,
+        default=None,
+        help="JSON file used to persist the backend chosen by --backend auto across runs.",
+    )
     parser.add_argument(
         "--connectivity",
         choices=[4, 8],
@@ -154,25 +804,189 @@ def parse_args() -> argparse.Namespace:
         default=8,
         help="Connected-component connectivity.",
     )
+    parser.add_argument(
+        "--pyramid-factor",
+        choices=[2, 4, 8],
+        type=int,
+        default=None,
+        help="Locate holes on an alpha plane pooled by this factor, then refine at full resolution.",
+    )
+    parser.add_argument(
+        "--band-height",
+        type=int,
+        default=None,
+        help="Label frames in horizontal bands of this many rows to bound memory on very large frames.",
+    )
+    parser.add_argument(
+        "--track",
+        action="store_true",
+        help="Label only around the previous frame's hole, falling back to a full pass when needed.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Detect frames on this many worker processes (default: 1, in this process).",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=8,
+        help="Frames handed to a worker at a time when --workers is above 1.",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage detection timings (decode, label, writes, ...) with percentiles after the run.",
+    )
     parser.add_argument(
         "--write-debug-images",
         action="store_true",
         help="Also write overlay and selected-region mask debug images.",
     )
+    parser.add_argument(
+        "--debug-overlay-region",
+        choices=["full", "bbox"],
+        default="full",
+        help="Write debug overlays for the whole frame or only the hole's bbox.",
+    )
+    parser.add_argument(
+        "--debug-overlay-downscale",
+        type=int,
+        default=1,
+        help="Integer factor to shrink debug overlays by before saving.",
+    )
+    parser.add_argument(
+        "--mask-format",
+        choices=["png", "npz"],
+        default="png",
+        help="Debug mask file format: 8-bit PNG or bit-packed NPZ cropped to the bbox.",
+    )
+    parser.add_argument(
+        "--inscribed-rect",
+        action="store_true",
+        help="Embed the largest rectangle fully inside the hole (inscribed_rect, x0 y0 x1 y1) in each frame's JSON.",
+    )
+    parser.add_argument(
+        "--transparency-index",
+        action="store_true",
+        help="Also write a summed-area-table transparency index per frame (transparency_index/<frame>.npz).",
+    )
+    parser.add_argument(
+        "--inline-mask-rle",
+        action="store_true",
+        help="Embed the selected region as a row-major RLE (mask_rle) in each frame's JSON.",
+    )
+    parser.add_argument(
+        "--polygon-tolerance",
+        type=float,
+        default=None,
+        help="Embed the hole's outer boundary (polygon), simplified to this tolerance in pixels.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse detection results for unchanged frames from this content-addressed cache directory.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=DEFAULT_MAX_BYTES / (1024 * 1024),
+        help="Evict least recently used cache entries once they take more than this many MiB on disk.",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["files", "bundle", "both"],
+        default="files",
+        help="Write one JSON per frame, one columnar __bundle__.json for the whole sequence "
+        "(also syncing the frames' __index__.json), or both.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and update the metadata as f_*.png frames are added, rewritten or removed.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.5,
+        help="Seconds between scans of the frames directory in --watch mode.",
+    )
+    parser.add_argument(
+        "--settle-time",
+        type=float,
+        default=0.5,
+        help="Seconds a frame must go unmodified before --watch processes it.",
+    )
+    parser.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help=f"Process every frame instead of only new or changed ones, and drop the {MANIFEST_NAME} "
+        "kept in the output directory.",
+    )
+    parser.add_argument(
+        "--alpha-stack",
+        type=Path,
+        default=None,
+        help="Read frames from an alpha stack built by alpha_stack.py instead of decoding PNGs "
+        "(debug overlays are then drawn on white).",
+    )
+    parser.add_argument(
+        "--container",
+        type=Path,
+        default=None,
+        help="Stream frames out of one multi-frame image (APNG, GIF, TIFF) instead of f_*.png files; "
+        "frames are named f_0000, f_0001, ... in file order.",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    build_frame_hole_metadata(
-        frames_dir=args.frames_dir,
+    if args.backend_cache is not None:
+        set_auto_backend_cache_path(args.backend_cache)
+    cache = None
+    if args.cache_dir is not None:
+        cache = DetectionCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    build_kwargs: Dict[str, Any] = dict(
         output_dir=args.output_dir,
         alpha_threshold=args.alpha_threshold,
         min_area=args.min_area,
         backend=args.backend,
         connectivity=args.connectivity,
         write_debug_images=args.write_debug_images,
+        pyramid_factor=args.pyramid_factor,
+        track=args.track,
+        mask_format=args.mask_format,
+        inline_mask_rle=args.inline_mask_rle,
+        overlay_region=args.debug_overlay_region,
+        overlay_downscale=args.debug_overlay_downscale,
+        polygon_tolerance=args.polygon_tolerance,
+        cache=cache,
+        alpha_stack=args.alpha_stack,
+        container=args.container,
+        band_height=args.band_height,
+        timings=args.timings,
+        write_transparency_index=args.transparency_index,
+        inscribed_rect=args.inscribed_rect,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        incremental=not args.full_rebuild,
+        output_format=args.output_format,
     )
+    if not args.watch:
+        build_frame_hole_metadata(frames_dir=args.frames_dir, **build_kwargs)
+        return
+    try:
+        watch_frame_hole_metadata(
+            frames_dir=args.frames_dir,
+            poll_interval=args.poll_interval,
+            settle_time=args.settle_time,
+            **build_kwargs,
+        )
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+import argparse
 import json
 import sys
 from pathlib import Path
@@ -11,34 +12,81 @@ REPO_ROOT = Path(__file__).resolve().parent.parent
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from image_utils import detect_primary_transparent_hole
+from alpha_stack import load_alpha_stack
+from detection_cache import (
+    DEFAULT_MAX_BYTES,
+    DetectionCache,
+    detect_transparent_holes_batch_cached,
+    format_cache_stats,
+)
+from image_utils import detect_transparent_holes_batch
+from metadata_bundle import BUNDLE_NAME, write_asset_index, write_metadata_bundle
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--alpha-stack",
+        type=Path,
+        default=None,
+        help="Read frames from an alpha stack built by alpha_stack.py instead of decoding PNGs.",
+    )
+    source.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse detection results for unchanged frames from this content-addressed cache directory.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=DEFAULT_MAX_BYTES / (1024 * 1024),
+        help="Evict least recently used cache entries once they take more than this many MiB on disk.",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["files", "bundle", "both"],
+        default="files",
+        help="Write one JSON per frame, one columnar __bundle__.json for the whole sequence "
+        "(also syncing assets/__index__.json), or both.",
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     frames_dir = Path(__file__).resolve().parent / "assets"
     output_dir = frames_dir / "json_final"
     output_dir.mkdir(parents=True, exist_ok=True)
+    if args.output_format == "files":
+        # The player prefers the bundle, so a stale one would hide the fresh JSON.
+        (output_dir / BUNDLE_NAME).unlink(missing_ok=True)
     
-    # Find all PNG files (any naming pattern)
-    frame_paths = sorted(frames_dir.glob("*.png"))
+    if args.alpha_stack is not None:
+        stack, frame_names = load_alpha_stack(args.alpha_stack)
+    else:
+        # Find all PNG files (any naming pattern)
+        frame_paths = sorted(frames_dir.glob("*.png"))
+        frame_names = [frame_path.stem for frame_path in frame_paths]
     
-    if not frame_paths:
+    if not frame_names:
         print(f"No PNG files found in {frames_dir}")
         sys.exit(1)
     
-    total = len(frame_paths)
+    total = len(frame_names)
     hits = 0
     
-    for idx, frame_path in enumerate(frame_paths):
-        frame_name = frame_path.stem
-        
-        result = detect_primary_transparent_hole(
-            frame_path,
-            alpha_threshold=250,
-            min_area=500,
-            backend="auto",
-            connectivity=8,
-        )
-        
+    detection_params = dict(alpha_threshold=250, min_area=500, backend="auto", connectivity=8)
+    cache = None
+    if args.alpha_stack is not None:
+        results = detect_transparent_holes_batch(stack, **detection_params)
+    elif args.cache_dir is not None:
+        cache = DetectionCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        results = detect_transparent_holes_batch_cached(cache, frame_paths, **detection_params)
+    else:
+        results = detect_transparent_holes_batch(frame_paths, **detection_params)
+    
+    bundle_frames = []
+    for idx, (frame_name, result) in enumerate(zip(frame_names, results)):
         output_payload = {
             "frame_index": idx,
             "frame_name": frame_name,
@@ -61,12 +109,22 @@ def main():
             output_payload["area"] = int(result["area"])
             output_payload["backend"] = result["backend"]
         
-        output_file = output_dir / f"{frame_name}.json"
-        output_file.write_text(json.dumps(output_payload, indent=2), encoding="utf-8")
+        if args.output_format != "bundle":
+            output_file = output_dir / f"{frame_name}.json"
+            output_file.write_text(json.dumps(output_payload, indent=2), encoding="utf-8")
+        if args.output_format != "files":
+            bundle_frames.append((frame_name, output_payload))
         print(f"[{idx+1}/{total}] {frame_name}: {'FOUND' if result else 'NOT FOUND'}")
     
+    if bundle_frames:
+        write_metadata_bundle(output_dir, bundle_frames)
+        if args.alpha_stack is None:
+            write_asset_index(frames_dir, [frame_path.name for frame_path in frame_paths])
+
     print(f"\nProcessed {total} frames. Detected hole in {hits} frames.")
     print(f"Metadata written to {output_dir}")
+    if cache is not None:
+        print(format_cache_stats(cache.stats()))
 
 if __name__ == "__main__":
     main()
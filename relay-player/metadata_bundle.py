@@ -0,0 +1,75 @@
+"""Single-file metadata bundle for relay-player.
+
+Instead of one ``<frame>.json`` per frame, a bundle holds the whole sequence as
+columnar JSON: a ``names`` list in playback order and one list per payload
+field, so the player fetches (and the builders write) one file.
+
+    {"version": 1, "names": ["f_0000", ...],
+     "columns": {"frame_index": [0, ...], "bbox": [[x0, y0, x1, y1], ...], ...}}
+
+Every column has one entry per name; fields a frame's payload does not have are
+``null``. ``__index__.json`` next to the frames is rewritten with the same frame
+list whenever a bundle is written, so the player's frame list and the bundle
+always agree.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+BUNDLE_NAME = "__bundle__.json"
+BUNDLE_VERSION = 1
+ASSET_INDEX_NAME = "__index__.json"
+
+
+def encode_metadata_bundle(frames: Sequence[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Turn ``(frame_name, payload)`` pairs into the columnar bundle layout."""
+    columns: Dict[str, List[Any]] = {}
+    for row, (_, payload) in enumerate(frames):
+        for field, value in payload.items():
+            column = columns.get(field)
+            if column is None:
+                column = columns[field] = [None] * row
+            column.append(value)
+        for field, column in columns.items():
+            if len(column) == row:
+                column.append(None)
+    return {"version": BUNDLE_VERSION, "names": [name for name, _ in frames], "columns": columns}
+
+
+def decode_metadata_bundle(bundle: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Return ``{frame_name: payload}`` from a bundle, in bundle order."""
+    if bundle.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported metadata bundle version: {bundle.get('version')}")
+    columns = bundle["columns"]
+    return {
+        name: {field: column[row] for field, column in columns.items()}
+        for row, name in enumerate(bundle["names"])
+    }
+
+
+def write_metadata_bundle(output_dir: Path, frames: Sequence[Tuple[str, Dict[str, Any]]]) -> Path:
+    """Write ``frames`` as ``output_dir/__bundle__.json`` and return its path."""
+    path = output_dir / BUNDLE_NAME
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text(json.dumps(encode_metadata_bundle(frames), separators=(",", ":")), encoding="utf-8")
+    temp_path.replace(path)
+    return path
+
+
+def read_metadata_bundle(output_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Payloads from ``output_dir/__bundle__.json``, or none if it is missing or unreadable."""
+    try:
+        return decode_metadata_bundle(json.loads((output_dir / BUNDLE_NAME).read_text(encoding="utf-8")))
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_asset_index(frames_dir: Path, file_names: Sequence[str]) -> None:
+    """Rewrite ``frames_dir/__index__.json`` to list ``file_names`` in playback order."""
+    path = frames_dir / ASSET_INDEX_NAME
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text(json.dumps({"files": list(file_names)}, indent=2), encoding="utf-8")
+    temp_path.replace(path)
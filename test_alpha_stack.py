@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from alpha_stack import alpha_stack_index_path, build_alpha_stack, load_alpha_stack
+from image_utils import detect_primary_transparent_hole, detect_transparent_holes_batch
+
+
+class AlphaStackTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.frame_paths = []
+        for index in range(3):
+            rgba = np.full((40, 50, 4), 200, dtype=np.uint8)
+            rgba[:, :, 3] = 255
+            rgba[5 + index : 20 + index, 10:30, 3] = 0
+            path = self.tmp_path / f"f_{index:04d}.png"
+            Image.fromarray(rgba, mode="RGBA").save(path)
+            self.frame_paths.append(path)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_and_detection_from_memmap(self) -> None:
+        stack_path = build_alpha_stack(self.frame_paths, self.tmp_path / "stack" / "alpha.npy")
+        stack, names = load_alpha_stack(stack_path)
+
+        self.assertIsInstance(stack, np.memmap)
+        self.assertEqual(stack.shape, (3, 40, 50))
+        self.assertEqual(names, ["f_0000", "f_0001", "f_0002"])
+        self.assertFalse(stack.flags.writeable)
+
+        expected = [detect_primary_transparent_hole(path, min_area=10) for path in self.frame_paths]
+        self.assertEqual(detect_transparent_holes_batch(stack, min_area=10), expected)
+        self.assertEqual(detect_primary_transparent_hole(stack[1], min_area=10), expected[1])
+
+    def test_rejects_frames_of_different_sizes(self) -> None:
+        odd = self.tmp_path / "f_0003.png"
+        Image.new("RGBA", (10, 10)).save(odd)
+        with self.assertRaises(ValueError):
+            build_alpha_stack(self.frame_paths + [odd], self.tmp_path / "alpha.npy")
+
+    def test_rejects_index_that_does_not_match_stack(self) -> None:
+        stack_path = build_alpha_stack(self.frame_paths, self.tmp_path / "alpha.npy")
+        alpha_stack_index_path(stack_path).write_text('{"frames": ["f_0000"]}', encoding="utf-8")
+        with self.assertRaises(ValueError):
+            load_alpha_stack(stack_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "relay-player"))
+
+from build_frame_hole_metadata import (  # noqa: E402
+    _frame_content,
+    build_frame_hole_metadata,
+    watch_frame_hole_metadata,
+)
+from alpha_stack import build_alpha_stack  # noqa: E402
+from detection_cache import DetectionCache  # noqa: E402
+from metadata_bundle import (  # noqa: E402
+    decode_metadata_bundle,
+    encode_metadata_bundle,
+    read_metadata_bundle,
+)
+
+
+def _write_frame(path: Path, hole: tuple[int, int, int, int]) -> None:
+    rgba = np.full((60, 80, 4), 255, dtype=np.uint8)
+    y0, y1, x0, x1 = hole
+    rgba[y0:y1, x0:x1, 3] = 0
+    Image.fromarray(rgba, mode="RGBA").save(path)
+
+
+def _hole(index: int) -> tuple[int, int, int, int]:
+    return (5 + index, 25 + index, 10, 40)
+
+
+class BuilderTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.frames_dir = self.tmp_path / "frames"
+        self.frames_dir.mkdir()
+        self.output_dir = self.tmp_path / "json_final"
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def write_frames(self, count: int) -> None:
+        for index in range(count):
+            _write_frame(self.frames_dir / f"f_{index:04d}.png", _hole(index))
+
+    def build(self, **overrides: Any) -> str:
+        """Run the builder with small-frame defaults and return what it printed."""
+        params: Dict[str, Any] = dict(
+            frames_dir=self.frames_dir,
+            output_dir=self.output_dir,
+            alpha_threshold=250,
+            min_area=20,
+            backend="numpy",
+            connectivity=8,
+            write_debug_images=False,
+        )
+        params.update(overrides)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            build_frame_hole_metadata(**params)
+        return out.getvalue()
+
+    def outputs(self, output_dir: Path | None = None) -> Dict[str, Dict[str, Any]]:
+        output_dir = output_dir or self.output_dir
+        return {path.stem: json.loads(path.read_text(encoding="utf-8")) for path in output_dir.glob("f_*.json")}
+
+
+class WorkerPoolTests(BuilderTestCase):
+    def test_matches_sequential_output(self) -> None:
+        self.write_frames(7)
+        self.build(incremental=False, inline_mask_rle=True)
+        sequential = self.outputs()
+        pooled_dir = self.tmp_path / "pooled"
+        self.build(output_dir=pooled_dir, incremental=False, inline_mask_rle=True, workers=2, chunk_size=2)
+        self.assertEqual(self.outputs(pooled_dir), sequential)
+        self.assertEqual([sequential[f"f_{index:04d}"]["output_index"] for index in range(7)], list(range(7)))
+
+    def test_failure_keeps_cached_results_of_its_chunk(self) -> None:
+        self.write_frames(7)
+        cache = DetectionCache(self.tmp_path / "cache")
+        self.build(cache=cache, incremental=False)
+        expected = self.outputs()
+        (self.frames_dir / "f_0005.png").write_bytes(b"not a png")
+
+        with self.assertRaises(Exception):
+            self.build(cache=cache, workers=2, chunk_size=8)
+        written = self.outputs()
+        for index in range(5):  # cache hits sharing the failed chunk
+            self.assertEqual(written[f"f_{index:04d}"], expected[f"f_{index:04d}"])
+
+        _write_frame(self.frames_dir / "f_0005.png", _hole(5))
+        self.build(cache=cache, workers=2, chunk_size=8)
+        self.assertEqual(self.outputs(), expected)
+
+    def test_rejects_tracking(self) -> None:
+        self.write_frames(1)
+        with self.assertRaises(ValueError):
+            self.build(track=True, workers=2)
+
+
+class AlphaStackInputTests(BuilderTestCase):
+    def test_alpha_stack_matches_png_frames(self) -> None:
+        self.write_frames(3)
+        self.build(incremental=False)
+        stack_path = build_alpha_stack(sorted(self.frames_dir.glob("f_*.png")), self.tmp_path / "stack.npy")
+        stack_dir = self.tmp_path / "from_stack"
+        self.build(output_dir=stack_dir, alpha_stack=stack_path)
+        self.assertEqual(self.outputs(stack_dir), self.outputs())
+
+    def test_alpha_stack_with_other_frame_names_is_rejected(self) -> None:
+        _write_frame(self.frames_dir / "alpha_alley.png", _hole(0))
+        stack_path = build_alpha_stack([self.frames_dir / "alpha_alley.png"], self.tmp_path / "stack.npy")
+        with self.assertRaisesRegex(ValueError, "alpha_alley"):
+            self.build(alpha_stack=stack_path)
+
+
+class IncrementalManifestTests(BuilderTestCase):
+    def test_rebuilds_only_changed_frames(self) -> None:
+        self.write_frames(4)
+        self.assertIn("4 frames rebuilt, 0 unchanged, 0 removed", self.build())
+        self.assertIn("0 frames rebuilt, 4 unchanged, 0 removed", self.build())
+
+        _write_frame(self.frames_dir / "f_0001.png", (30, 50, 40, 70))
+        touched = self.frames_dir / "f_0002.png"
+        os.utime(touched, ns=(touched.stat().st_atime_ns, touched.stat().st_mtime_ns + 10**9))
+        self.assertIn("1 frames rebuilt, 3 unchanged, 0 removed", self.build())
+        self.assertEqual(self.outputs()["f_0001"]["bbox"], [40, 30, 70, 50])
+
+        fresh_dir = self.tmp_path / "fresh"
+        self.build(output_dir=fresh_dir, incremental=False)
+        self.assertEqual(self.outputs(), self.outputs(fresh_dir))
+
+    def test_prunes_deleted_frames_and_shifts_output_index(self) -> None:
+        self.write_frames(4)
+        self.build(write_transparency_index=True)
+        (self.frames_dir / "f_0001.png").unlink()
+
+        self.assertIn("0 frames rebuilt, 3 unchanged, 1 removed", self.build(write_transparency_index=True))
+        outputs = self.outputs()
+        self.assertEqual(sorted(outputs), ["f_0000", "f_0002", "f_0003"])
+        self.assertEqual([outputs[name]["output_index"] for name in sorted(outputs)], [0, 1, 2])
+        self.assertFalse((self.output_dir / "transparency_index" / "f_0001.npz").exists())
+        manifest = json.loads((self.output_dir / "__manifest__.json").read_text(encoding="utf-8"))
+        self.assertEqual(sorted(manifest["frames"]), ["f_0000", "f_0002", "f_0003"])
+
+    def test_parameter_change_rebuilds_everything(self) -> None:
+        self.write_frames(3)
+        self.build()
+        self.assertIn("3 frames rebuilt, 0 unchanged", self.build(min_area=10))
+        self.assertIn("3 frames rebuilt, 0 unchanged", self.build(min_area=10, inscribed_rect=True))
+        self.assertIn("inscribed_rect", self.outputs()["f_0000"])
+
+    def test_full_rebuild_drops_the_manifest(self) -> None:
+        self.write_frames(2)
+        self.build()
+        self.build(incremental=False)
+        self.assertFalse((self.output_dir / "__manifest__.json").exists())
+        self.assertIn("2 frames rebuilt, 0 unchanged", self.build())
+
+
+class MetadataBundleTests(BuilderTestCase):
+    def test_encode_decode_round_trip(self) -> None:
+        frames = [
+            ("a", {"frame_index": 0, "bbox": None, "has_mask": False}),
+            ("b", {"frame_index": 1, "bbox": [1, 2, 3, 4], "has_mask": True, "backend": "numpy"}),
+            ("c", {"frame_index": 2, "has_mask": False}),
+        ]
+        bundle = encode_metadata_bundle(frames)
+        self.assertEqual(bundle["names"], ["a", "b", "c"])
+        self.assertEqual(bundle["columns"]["backend"], [None, "numpy", None])
+        decoded = decode_metadata_bundle(json.loads(json.dumps(bundle)))
+        self.assertEqual(list(decoded), ["a", "b", "c"])
+        for name, payload in frames:
+            self.assertEqual({field: value for field, value in decoded[name].items() if field in payload}, payload)
+            self.assertTrue(all(decoded[name][field] is None for field in decoded[name] if field not in payload))
+        with self.assertRaises(ValueError):
+            decode_metadata_bundle({**bundle, "version": 99})
+
+    def test_bundle_matches_files_and_syncs_asset_index(self) -> None:
+        self.write_frames(3)
+        self.build(output_format="both", inscribed_rect=True)
+        bundle = read_metadata_bundle(self.output_dir)
+        for name, payload in self.outputs().items():
+            self.assertEqual({field: bundle[name][field] for field in payload}, payload)
+        asset_index = json.loads((self.frames_dir / "__index__.json").read_text(encoding="utf-8"))
+        self.assertEqual(asset_index["files"], ["f_0000.png", "f_0001.png", "f_0002.png"])
+
+        (self.frames_dir / "f_0001.png").unlink()
+        self.build(output_format="bundle", inscribed_rect=True)
+        self.assertEqual(list(read_metadata_bundle(self.output_dir)), ["f_0000", "f_0002"])
+        asset_index = json.loads((self.frames_dir / "__index__.json").read_text(encoding="utf-8"))
+        self.assertEqual(asset_index["files"], ["f_0000.png", "f_0002.png"])
+
+    def test_switching_formats_never_leaves_stale_metadata(self) -> None:
+        self.write_frames(3)
+        self.build()
+        _write_frame(self.frames_dir / "f_0001.png", (30, 50, 40, 70))
+        self.build(output_format="bundle")
+        self.assertEqual(read_metadata_bundle(self.output_dir)["f_0001"]["bbox"], [40, 30, 70, 50])
+
+        self.build()
+        self.assertEqual(self.outputs()["f_0001"]["bbox"], [40, 30, 70, 50])
+        self.assertFalse((self.output_dir / "__bundle__.json").exists())
+
+
+class WatchModeTests(BuilderTestCase):
+    def watch(self, max_builds: int) -> str:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            watch_frame_hole_metadata(
+                frames_dir=self.frames_dir,
+                output_dir=self.output_dir,
+                alpha_threshold=250,
+                min_area=20,
+                backend="numpy",
+                connectivity=8,
+                write_debug_images=False,
+                output_format="both",
+                poll_interval=0.01,
+                settle_time=0.0,
+                max_builds=max_builds,
+            )
+        return out.getvalue()
+
+    def wait_for(self, path: Path, *, present: bool = True) -> None:
+        deadline = time.monotonic() + 10
+        while path.exists() != present:
+            self.assertLess(time.monotonic(), deadline, f"timed out waiting for {path}")
+            time.sleep(0.01)
+
+    def test_processes_finished_frames_and_skips_partial_ones(self) -> None:
+        self.write_frames(2)
+        data = (self.frames_dir / "f_0001.png").read_bytes()
+        (self.frames_dir / "f_0002.png").write_bytes(data[: len(data) // 2])  # still being written
+
+        def render() -> None:
+            self.wait_for(self.output_dir / "f_0001.json")
+            (self.frames_dir / "f_0002.png").write_bytes(data)
+
+        writer = threading.Thread(target=render)
+        writer.start()
+        self.watch(max_builds=2)
+        writer.join()
+
+        outputs = self.outputs()
+        self.assertEqual(sorted(outputs), ["f_0000", "f_0001", "f_0002"])
+        self.assertEqual(outputs["f_0002"]["bbox"], outputs["f_0001"]["bbox"])
+        self.assertEqual(len(read_metadata_bundle(self.output_dir)), 3)
+
+    def test_removing_every_frame_prunes_all_outputs(self) -> None:
+        self.write_frames(2)
+
+        def remove_all() -> None:
+            self.wait_for(self.output_dir / "f_0001.json")
+            for frame_path in self.frames_dir.glob("f_*.png"):
+                frame_path.unlink()
+
+        remover = threading.Thread(target=remove_all)
+        remover.start()
+        self.watch(max_builds=2)
+        remover.join()
+
+        self.assertEqual(self.outputs(), {})
+        self.assertEqual(read_metadata_bundle(self.output_dir), {})
+        asset_index = json.loads((self.frames_dir / "__index__.json").read_text(encoding="utf-8"))
+        self.assertEqual(asset_index["files"], [])
+        manifest = json.loads((self.output_dir / "__manifest__.json").read_text(encoding="utf-8"))
+        self.assertEqual(manifest["frames"], {})
+
+    def test_empty_frames_dir_without_manifest_still_raises(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            self.build()
+
+
+def _palette_frame(transparent_index: int, palette: list[int]) -> Image.Image:
+    img = Image.fromarray(np.array([[0, 1], [1, 0]], dtype=np.uint8), mode="P")
+    img.putpalette(palette)
+    img.info["transparency"] = transparent_index
+    return img
+
+
+class FrameContentTests(unittest.TestCase):
+    def test_palette_frames_differ_by_transparency_and_palette(self) -> None:
+        palette = [0, 0, 0, 255, 255, 255]
+        base = _frame_content(_palette_frame(0, palette))
+        self.assertEqual(base, _frame_content(_palette_frame(0, palette)))
+        self.assertNotEqual(base, _frame_content(_palette_frame(1, palette)))
+        self.assertNotEqual(base, _frame_content(_palette_frame(0, [9, 9, 9, 255, 255, 255])))
+
+    def test_arrays_and_files_use_their_bytes(self) -> None:
+        alpha = np.arange(6, dtype=np.uint8).reshape(2, 3)
+        self.assertEqual(_frame_content(alpha), alpha.tobytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+import detection_cache
+from detection_cache import (
+    DetectionCache,
+    detect_primary_transparent_hole_cached,
+    detect_transparent_holes_batch_cached,
+)
+from image_utils import detect_primary_transparent_hole
+
+
+def _write_frame(path: Path, hole: tuple[int, int, int, int]) -> None:
+    rgba = np.full((60, 80, 4), 255, dtype=np.uint8)
+    y0, y1, x0, x1 = hole
+    rgba[y0:y1, x0:x1, 3] = 0
+    Image.fromarray(rgba, mode="RGBA").save(path)
+
+
+class DetectionCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.cache_dir = self.tmp_path / "cache"
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_hit_returns_same_result_without_detecting(self) -> None:
+        frame = self.tmp_path / "f_0001.png"
+        _write_frame(frame, (10, 30, 20, 50))
+        cache = DetectionCache(self.cache_dir)
+        params = dict(min_area=50, backend="numpy", mask_rle=True)
+
+        first = detect_primary_transparent_hole_cached(cache, frame, **params)
+        with mock.patch.object(detection_cache, "detect_primary_transparent_hole") as detect:
+            second = detect_primary_transparent_hole_cached(DetectionCache(self.cache_dir), frame, **params)
+        detect.assert_not_called()
+        self.assertEqual(second, first)
+        self.assertEqual(first, detect_primary_transparent_hole(frame, **params))
+
+    def test_key_covers_content_and_parameters(self) -> None:
+        cache = DetectionCache(self.cache_dir)
+        base = cache.key(b"frame", min_area=500)
+        self.assertEqual(base, cache.key(b"frame"))  # explicit defaults match omitted ones
+        self.assertNotEqual(base, cache.key(b"frame2"))
+        self.assertNotEqual(base, cache.key(b"frame", alpha_threshold=128))
+        self.assertNotEqual(base, cache.key(b"frame", connectivity=4))
+        with mock.patch.object(detection_cache, "DETECTION_VERSION", detection_cache.DETECTION_VERSION + 1):
+            self.assertNotEqual(base, cache.key(b"frame"))
+        with self.assertRaises(ValueError):
+            cache.key(b"frame", overlay_output_path="x.png")
+
+    def test_caches_frames_without_a_hole(self) -> None:
+        cache = DetectionCache(self.cache_dir)
+        key = cache.key(b"empty")
+        self.assertEqual(cache.get(key), (False, None))
+        cache.put(key, None)
+        self.assertEqual(cache.get(key), (True, None))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_does_not_store_timings(self) -> None:
+        cache = DetectionCache(self.cache_dir)
+        key = cache.key(b"frame")
+        cache.put(key, {"area": 3, "timings": {"total": 0.1}})
+        self.assertEqual(cache.get(key), (True, {"area": 3}))
+
+    def test_batch_detects_only_misses(self) -> None:
+        frames = []
+        for index in range(4):
+            frame = self.tmp_path / f"f_{index:04d}.png"
+            _write_frame(frame, (5 + index, 25 + index, 10, 40))
+            frames.append(frame)
+        cache = DetectionCache(self.cache_dir)
+        params = dict(min_area=50, backend="numpy", connectivity=8)
+        expected = detect_transparent_holes_batch_cached(cache, frames[:3], **params)
+
+        real_batch = detection_cache.detect_transparent_holes_batch
+        with mock.patch.object(detection_cache, "detect_transparent_holes_batch", side_effect=real_batch) as batch:
+            results = detect_transparent_holes_batch_cached(cache, frames, **params)
+        self.assertEqual([list(call.args[0]) for call in batch.call_args_list], [[frames[3]]])
+        self.assertEqual(results[:3], expected)
+        self.assertEqual(results[3], detect_primary_transparent_hole(frames[3], **params))
+
+    def test_evicts_least_recently_used_entries(self) -> None:
+        cache = DetectionCache(self.cache_dir)
+        keys = [cache.key(bytes([index])) for index in range(3)]
+        for age, key in enumerate(keys):
+            cache.put(key, {"area": 1})
+            os.utime(cache._path(key), (100 + age, 100 + age))
+        entry_size = cache.stats()["bytes"] // 3
+
+        small = DetectionCache(self.cache_dir, max_bytes=entry_size * 3)
+        self.assertEqual(small.stats()["entries"], 3)
+        self.assertTrue(small.get(keys[0])[0])  # now the most recently used
+        small.put(small.key(b"new"), {"area": 2})  # over the cap: evict down to 90% of it
+
+        stats = small.stats()
+        self.assertEqual(stats["evictions"], 2)
+        self.assertEqual(stats["entries"], 2)
+        self.assertLessEqual(stats["bytes"], small.max_bytes)
+        self.assertTrue(small.get(keys[0])[0])
+        self.assertFalse(small.get(keys[1])[0])
+        self.assertFalse(small.get(keys[2])[0])
+
+    def test_budget_counts_disk_blocks_and_evicts_in_batches(self) -> None:
+        cache = DetectionCache(self.cache_dir)
+        key = cache.key(b"frame")
+        cache.put(key, {"area": 1})
+        stat = cache._path(key).stat()
+        self.assertEqual(cache.stats()["bytes"], detection_cache._disk_bytes(stat))
+        self.assertGreaterEqual(cache.stats()["bytes"], stat.st_size)
+        entry_size = cache.stats()["bytes"]
+
+        small = DetectionCache(self.tmp_path / "small", max_bytes=entry_size * 20)
+        for index in range(21):
+            small.put(small.key(bytes([index])), {"area": index})
+        self.assertEqual(small.stats()["entries"], 18)  # 21 entries trimmed to 90% of 20
+        evictions = small.stats()["evictions"]
+        small.put(small.key(b"one more"), {"area": 0})
+        self.assertEqual(small.stats()["evictions"], evictions)  # room left below the cap
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,35 @@
 from __future__ import annotations
 
+import json
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 import numpy as np
 from PIL import Image
 
-from image_utils import detect_primary_transparent_hole
+import image_utils
+from image_utils import (
+    TransparentHoleTracker,
+    auto_backend_choices,
+    calibrate_auto_backend,
+    clear_auto_backend_choices,
+    clear_stage_timings,
+    decode_mask_rle,
+    detect_primary_transparent_hole,
+    detect_transparent_holes_batch,
+    detect_transparent_holes_sweep,
+    encode_mask_rle,
+    iter_transparent_holes,
+    load_mask,
+    record_stage_timings,
+    save_mask_npz,
+    seed_auto_backend_choices,
+    set_auto_backend_cache_path,
+    stage_timing_samples,
+    stage_timing_summary,
+)
 
 
 def _has_scipy() -> bool:
@@ -106,6 +128,245 @@ class DetectPrimaryTransparentHoleTests(unittest.TestCase):
         self.assertTrue(overlay_path.exists())
         self.assertTrue(mask_path.exists())
 
+    def test_overlay_tints_only_the_hole_and_supports_bbox_and_downscale(self) -> None:
+        rgba = np.zeros((60, 80, 4), dtype=np.uint8)
+        rgba[:, :, 0] = 200
+        rgba[:, :, 3] = 255
+        rgba[10:30, 20:50, 3] = 0
+        full_path = self.tmp_path / "overlay_full.png"
+        bbox_path = self.tmp_path / "overlay_bbox.png"
+        small_path = self.tmp_path / "overlay_small.png"
+
+        detect_primary_transparent_hole(rgba, min_area=100, overlay_output_path=full_path)
+        detect_primary_transparent_hole(
+            rgba, min_area=100, overlay_output_path=bbox_path, overlay_region="bbox"
+        )
+        detect_primary_transparent_hole(
+            rgba, min_area=100, overlay_output_path=small_path, overlay_downscale=4
+        )
+
+        with Image.open(full_path) as image:
+            overlay = np.asarray(image)
+        np.testing.assert_array_equal(overlay[15, 25], [70, 165, 0, 0])
+        np.testing.assert_array_equal(overlay[5, 5], rgba[5, 5])
+        with Image.open(bbox_path) as image:
+            self.assertEqual(image.size, (30, 20))
+            np.testing.assert_array_equal(np.asarray(image), overlay[10:30, 20:50])
+        with Image.open(small_path) as image:
+            self.assertEqual(image.size, (20, 15))
+
+    def test_rejects_invalid_overlay_options(self) -> None:
+        alpha = np.zeros((10, 10), dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(alpha, overlay_region="crop")  # type: ignore[arg-type]
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(alpha, overlay_downscale=0)
+
+    def test_accepts_in_memory_arrays_and_pil_images(self) -> None:
+        rgba = np.full((90, 120, 4), 255, dtype=np.uint8)
+        rgba[10:50, 20:70, 3] = 0
+        expected = {"x": 20, "y": 10, "width": 50, "height": 40}
+
+        sources = [
+            rgba,
+            rgba[:, :, 3].copy(),
+            Image.fromarray(rgba, mode="RGBA"),
+            Image.merge("LA", (Image.new("L", (120, 90), 128), Image.fromarray(rgba[:, :, 3], mode="L"))),
+        ]
+        for source in sources:
+            result = detect_primary_transparent_hole(image_path=source, min_area=500)
+            self.assertIsNotNone(result)
+            assert result is not None
+            self.assertEqual(result["bbox"], expected)
+            self.assertEqual(result["area"], 2000)
+
+    def test_alpha_only_decode_handles_palette_la_and_opaque_files(self) -> None:
+        indices = np.zeros((80, 100), dtype=np.uint8)
+        indices[15:55, 20:70] = 2
+        indices[60:62, 80:82] = 1
+
+        palette_trns = Image.fromarray(indices, mode="P")
+        palette_trns.putpalette([0, 0, 0, 255, 0, 0, 0, 255, 0])
+        palette_trns.info["transparency"] = bytes([255, 0, 0])
+        palette_index = palette_trns.copy()
+        palette_index.info = {"transparency": 2}
+        alpha = np.where(indices == 2, 0, 255).astype(np.uint8)
+        luminance_alpha = Image.merge("LA", (Image.new("L", (100, 80), 40), Image.fromarray(alpha, mode="L")))
+
+        for name, image in (("trns", palette_trns), ("index", palette_index), ("la", luminance_alpha)):
+            path = self.tmp_path / f"{name}.png"
+            image.save(path)
+            with Image.open(path) as reopened:
+                expected_alpha = np.asarray(reopened.convert("RGBA"))[:, :, 3]
+            expected = detect_primary_transparent_hole(expected_alpha, min_area=500)
+
+            result = detect_primary_transparent_hole(path, min_area=500)
+            self.assertEqual(result, expected, name)
+            assert result is not None
+            self.assertEqual(result["bbox"], {"x": 20, "y": 15, "width": 50, "height": 40})
+
+        opaque_path = self.tmp_path / "opaque.png"
+        Image.new("RGB", (100, 80), (10, 20, 30)).save(opaque_path)
+        self.assertIsNone(detect_primary_transparent_hole(opaque_path, min_area=1))
+
+    def test_alpha_array_input_can_write_overlay(self) -> None:
+        alpha = np.full((60, 60), 255, dtype=np.uint8)
+        alpha[10:40, 10:40] = 0
+        overlay_path = self.tmp_path / "overlay.png"
+
+        result = detect_primary_transparent_hole(alpha, min_area=500, overlay_output_path=overlay_path)
+
+        self.assertIsNotNone(result)
+        with Image.open(overlay_path) as overlay:
+            self.assertEqual(overlay.size, (60, 60))
+            self.assertEqual(overlay.mode, "RGBA")
+
+    def test_rejects_non_uint8_arrays(self) -> None:
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(np.zeros((20, 20), dtype=np.float32))
+
+    def test_stats_match_pixel_statistics_for_irregular_component(self) -> None:
+        alpha = np.full((100, 140), 255, dtype=np.uint8)
+        alpha[10:60, 15:35] = 0  # vertical bar of an L shape
+        alpha[45:60, 35:110] = 0  # horizontal bar
+        alpha[80:95, 100:130] = 0  # smaller separate hole
+
+        ys, xs = np.nonzero(alpha[:, :] == 0)
+        in_l = ys < 70
+        ys, xs = ys[in_l], xs[in_l]
+
+        backends = [name for name, available in (("scipy", _has_scipy()), ("opencv", _has_cv2())) if available]
+        for backend in backends:
+            result = detect_primary_transparent_hole(alpha, min_area=100, backend=backend)
+            assert result is not None
+            self.assertEqual(result["bbox"], {"x": 15, "y": 10, "width": 95, "height": 50})
+            self.assertEqual(result["area"], xs.size)
+            self.assertAlmostEqual(result["centroid"]["x"], float(xs.mean()), places=6)
+            self.assertAlmostEqual(result["centroid"]["y"], float(ys.mean()), places=6)
+            self.assertEqual(set(result), {"bbox", "centroid", "area", "backend"})
+
+    def test_equal_area_ties_pick_first_component_in_raster_order(self) -> None:
+        alpha = np.full((80, 80), 255, dtype=np.uint8)
+        alpha[50:70, 5:25] = 0
+        alpha[10:30, 50:70] = 0
+
+        result = detect_primary_transparent_hole(alpha, min_area=100, backend="numpy")
+
+        assert result is not None
+        self.assertEqual(result["bbox"], {"x": 50, "y": 10, "width": 20, "height": 20})
+
+    def test_top_k_reports_components_largest_first(self) -> None:
+        alpha = np.full((120, 160), 255, dtype=np.uint8)
+        alpha[5:25, 5:35] = 0  # 600 px
+        alpha[40:80, 40:90] = 0  # 2000 px
+        alpha[90:110, 100:150] = 0  # 1000 px
+        alpha[100:110, 5:15] = 0  # 100 px, below min_area
+
+        backends = ["numpy"] + [name for name, ok in (("scipy", _has_scipy()), ("opencv", _has_cv2())) if ok]
+        for backend in backends:
+            result = detect_primary_transparent_hole(alpha, min_area=500, backend=backend, top_k=5)
+            assert result is not None
+            self.assertEqual([c["area"] for c in result["components"]], [2000, 1000, 600])
+            self.assertEqual(result["components"][0]["bbox"], result["bbox"])
+            self.assertEqual(result["components"][2]["bbox"], {"x": 5, "y": 5, "width": 30, "height": 20})
+            self.assertAlmostEqual(result["components"][1]["centroid"]["x"], 124.5)
+
+            limited = detect_primary_transparent_hole(alpha, min_area=500, backend=backend, top_k=2)
+            assert limited is not None
+            self.assertEqual([c["area"] for c in limited["components"]], [2000, 1000])
+
+    def test_top_k_must_be_positive(self) -> None:
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(np.zeros((10, 10), dtype=np.uint8), top_k=0)
+
+    def test_pyramid_mode_matches_full_resolution(self) -> None:
+        rng = np.random.default_rng(3)
+        alpha = np.full((203, 317), 255, dtype=np.uint8)
+        alpha[rng.random(alpha.shape) < 0.02] = 0  # scattered noise
+        alpha[20:90, 30:75] = 0
+        alpha[60:70, 75:200] = 0  # thin arm joining the first hole
+        alpha[120:190, 220:310] = 0
+        alpha[150:200, 10:60] = 0
+
+        backends = ["numpy"] + (["scipy"] if _has_scipy() else [])
+        for backend in backends:
+            for connectivity in (4, 8):
+                expected = detect_primary_transparent_hole(
+                    alpha, min_area=200, backend=backend, connectivity=connectivity, top_k=3
+                )
+                for factor in (2, 4, 8):
+                    actual = detect_primary_transparent_hole(
+                        alpha,
+                        min_area=200,
+                        backend=backend,
+                        connectivity=connectivity,
+                        top_k=3,
+                        pyramid_factor=factor,
+                    )
+                    assert actual is not None and expected is not None
+                    self.assertEqual(len(actual["components"]), len(expected["components"]))
+                    for got, want in zip(actual["components"], expected["components"]):
+                        self.assertEqual(got["bbox"], want["bbox"])
+                        self.assertEqual(got["area"], want["area"])
+                        self.assertAlmostEqual(got["centroid"]["x"], want["centroid"]["x"], places=9)
+                        self.assertAlmostEqual(got["centroid"]["y"], want["centroid"]["y"], places=9)
+
+    def test_pyramid_mode_writes_full_frame_mask(self) -> None:
+        alpha = np.full((101, 77), 255, dtype=np.uint8)
+        alpha[33:90, 17:70] = 0
+        mask_path = self.tmp_path / "pyramid_mask.png"
+
+        detect_primary_transparent_hole(alpha, min_area=100, pyramid_factor=8, mask_output_path=mask_path)
+
+        with Image.open(mask_path) as mask_image:
+            np.testing.assert_array_equal(np.asarray(mask_image) > 0, alpha == 0)
+
+    def test_rejects_unsupported_pyramid_factor(self) -> None:
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(np.zeros((10, 10), dtype=np.uint8), pyramid_factor=3)
+
+    def test_banded_mode_matches_one_shot_detection(self) -> None:
+        rng = np.random.default_rng(16)
+        backends = ["numpy"] + (["scipy"] if _has_scipy() else [])
+        for trial in range(8):
+            alpha = np.where(rng.random((47, 61)) < 0.45, 0, 255).astype(np.uint8)
+            for backend in backends:
+                for connectivity in (4, 8):
+                    expected = detect_primary_transparent_hole(
+                        alpha, min_area=1, backend=backend, connectivity=connectivity, top_k=5
+                    )
+                    for band_height in (1, 7, 47):
+                        with self.subTest(trial=trial, backend=backend, connectivity=connectivity, band=band_height):
+                            actual = detect_primary_transparent_hole(
+                                alpha,
+                                min_area=1,
+                                backend=backend,
+                                connectivity=connectivity,
+                                top_k=5,
+                                band_height=band_height,
+                            )
+                            self.assertEqual(actual, expected)
+
+    def test_banded_mode_joins_components_across_seams(self) -> None:
+        alpha = np.full((40, 40), 255, dtype=np.uint8)
+        for step in range(30):  # staircase touching only diagonally between rows
+            alpha[5 + step, 5 + step] = 0
+        for connectivity, area in ((8, 30), (4, 1)):
+            result = detect_primary_transparent_hole(
+                alpha, min_area=1, backend="numpy", connectivity=connectivity, band_height=4
+            )
+            assert result is not None
+            self.assertEqual(result["area"], area)
+
+    def test_banded_mode_rejects_image_outputs(self) -> None:
+        alpha = np.zeros((10, 10), dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(alpha, band_height=0)
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(alpha, band_height=4, mask_rle=True)
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(alpha, band_height=4, mask_output_path=self.tmp_path / "mask.png")
+
     @unittest.skipUnless(_has_scipy(), "scipy not installed")
     def test_scipy_backend(self) -> None:
         rgba = np.full((80, 130, 4), 255, dtype=np.uint8)
@@ -130,6 +391,40 @@ class DetectPrimaryTransparentHoleTests(unittest.TestCase):
         self.assertEqual(result["backend"], "opencv")
         self.assertEqual(result["bbox"], {"x": 30, "y": 25, "width": 70, "height": 30})
 
+    def test_numpy_backend(self) -> None:
+        rgba = np.full((80, 130, 4), 255, dtype=np.uint8)
+        rgba[25:55, 30:100, 3] = 0
+        image_path = self._write_rgba("numpy_backend.png", rgba)
+        mask_path = self.tmp_path / "numpy_mask.png"
+
+        result = detect_primary_transparent_hole(
+            image_path, min_area=500, backend="numpy", mask_output_path=mask_path
+        )
+        self.assertIsNotNone(result)
+        assert result is not None
+        self.assertEqual(result["backend"], "numpy")
+        self.assertEqual(result["bbox"], {"x": 30, "y": 25, "width": 70, "height": 30})
+        with Image.open(mask_path) as mask_image:
+            np.testing.assert_array_equal(np.asarray(mask_image) > 0, rgba[:, :, 3] == 0)
+
+    @unittest.skipUnless(_has_scipy(), "scipy not installed")
+    def test_numpy_backend_matches_scipy_on_random_masks(self) -> None:
+        rng = np.random.default_rng(7)
+        for _ in range(25):
+            alpha = np.where(rng.random((70, 90)) < 0.45, 0, 255).astype(np.uint8)
+            for connectivity in (4, 8):
+                expected = detect_primary_transparent_hole(
+                    alpha, min_area=5, backend="scipy", connectivity=connectivity
+                )
+                actual = detect_primary_transparent_hole(
+                    alpha, min_area=5, backend="numpy", connectivity=connectivity
+                )
+                assert expected is not None and actual is not None
+                self.assertEqual(actual["bbox"], expected["bbox"])
+                self.assertEqual(actual["area"], expected["area"])
+                self.assertAlmostEqual(actual["centroid"]["x"], expected["centroid"]["x"], places=9)
+                self.assertAlmostEqual(actual["centroid"]["y"], expected["centroid"]["y"], places=9)
+
     @unittest.skipUnless(_has_scipy() and _has_cv2(), "scipy or opencv not installed")
     def test_backend_parity_for_bbox_area(self) -> None:
         rgba = np.full((140, 200, 4), 255, dtype=np.uint8)
@@ -150,5 +445,487 @@ class DetectPrimaryTransparentHoleTests(unittest.TestCase):
         self.assertAlmostEqual(scipy_result["centroid"]["y"], cv_result["centroid"]["y"], places=5)
 
 
+class DetectTransparentHolesBatchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _frames(self) -> list[np.ndarray]:
+        frames = []
+        for offset in range(3):
+            rgba = np.full((90, 120, 4), 255, dtype=np.uint8)
+            rgba[10 + offset * 5 : 50 + offset * 5, 20:70, 3] = 0
+            frames.append(rgba)
+        # Last frame has no hole large enough to keep.
+        empty = np.full((90, 120, 4), 255, dtype=np.uint8)
+        empty[5:10, 5:10, 3] = 0
+        frames.append(empty)
+        return frames
+
+    def test_paths_match_single_frame_detection(self) -> None:
+        paths = []
+        for index, rgba in enumerate(self._frames()):
+            path = self.tmp_path / f"f_{index}.png"
+            Image.fromarray(rgba, mode="RGBA").save(path)
+            paths.append(path)
+
+        results = detect_transparent_holes_batch(paths, min_area=500)
+
+        self.assertEqual(len(results), 4)
+        for path, result in zip(paths, results):
+            self.assertEqual(result, detect_primary_transparent_hole(path, min_area=500))
+        self.assertIsNone(results[-1])
+        assert results[1] is not None
+        self.assertEqual(results[1]["bbox"], {"x": 20, "y": 15, "width": 50, "height": 40})
+
+    def test_alpha_stack_input(self) -> None:
+        stack = np.stack([rgba[:, :, 3] for rgba in self._frames()])
+
+        results = detect_transparent_holes_batch(stack, min_area=500)
+
+        self.assertEqual([r is None for r in results], [False, False, False, True])
+        assert results[2] is not None
+        self.assertEqual(results[2]["area"], 2000)
+
+    def test_rgba_stack_input(self) -> None:
+        stack = np.stack(self._frames())
+
+        results = detect_transparent_holes_batch(stack, min_area=500)
+
+        assert results[0] is not None
+        self.assertEqual(results[0]["bbox"], {"x": 20, "y": 10, "width": 50, "height": 40})
+        self.assertIsNone(results[3])
+
+    def test_rejects_stack_with_wrong_rank(self) -> None:
+        with self.assertRaises(ValueError):
+            detect_transparent_holes_batch(np.zeros((10, 10), dtype=np.uint8))
+
+
+class DetectTransparentHolesSweepTests(unittest.TestCase):
+    def test_matches_detection_at_each_threshold(self) -> None:
+        rng = np.random.default_rng(19)
+        for trial in range(10):
+            alpha = rng.integers(0, 256, size=(37, 45), dtype=np.uint8)
+            thresholds = [200, 40, 128, 40, 255, 1, 90]
+            for connectivity in (4, 8):
+                with self.subTest(trial=trial, connectivity=connectivity):
+                    expected = [
+                        detect_primary_transparent_hole(
+                            alpha,
+                            alpha_threshold=threshold,
+                            min_area=3,
+                            backend="numpy",
+                            connectivity=connectivity,
+                            top_k=3,
+                        )
+                        for threshold in thresholds
+                    ]
+                    actual = detect_transparent_holes_sweep(
+                        alpha, thresholds, min_area=3, connectivity=connectivity, top_k=3
+                    )
+                    self.assertEqual(actual, expected)
+
+    def test_components_merge_as_threshold_rises(self) -> None:
+        alpha = np.full((20, 30), 255, dtype=np.uint8)
+        alpha[5:15, 2:10] = 0
+        alpha[5:15, 10:12] = 150  # bridge that opens only above 150
+        alpha[5:15, 12:28] = 50
+        results = detect_transparent_holes_sweep(alpha, [10, 100, 200], min_area=1)
+        self.assertEqual([result["area"] if result else 0 for result in results], [80, 160, 260])
+        self.assertEqual(results[2]["bbox"], {"x": 2, "y": 5, "width": 26, "height": 10})
+
+    def test_empty_and_invalid_thresholds(self) -> None:
+        alpha = np.zeros((4, 4), dtype=np.uint8)
+        self.assertEqual(detect_transparent_holes_sweep(alpha, []), [])
+        with self.assertRaises(ValueError):
+            detect_transparent_holes_sweep(alpha, [128, 0])
+
+
+class IterTransparentHolesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.frames = []
+        for index in range(4):
+            rgba = np.full((60, 80, 4), 255, dtype=np.uint8)
+            rgba[:, :, 0] = 40 * index
+            rgba[10 + 5 * index : 30 + 5 * index, 10:40, 3] = 0
+            self.frames.append(Image.fromarray(rgba, mode="RGBA"))
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_streams_every_frame_of_multi_frame_files(self) -> None:
+        expected = detect_transparent_holes_batch(self.frames, min_area=10, backend="numpy")
+        for suffix, options in [(".png", {}), (".gif", {"disposal": 2}), (".tiff", {})]:
+            path = self.tmp_path / f"anim{suffix}"
+            self.frames[0].save(path, save_all=True, append_images=self.frames[1:], **options)
+            with self.subTest(suffix=suffix):
+                results = iter_transparent_holes(path, min_area=10, backend="numpy")
+                self.assertNotIsInstance(results, list)
+                self.assertEqual(list(results), expected)
+
+    def test_single_frame_image_yields_one_result(self) -> None:
+        path = self.tmp_path / "still.png"
+        self.frames[2].save(path)
+        self.assertEqual(
+            list(iter_transparent_holes(path, min_area=10)),
+            [detect_primary_transparent_hole(path, min_area=10)],
+        )
+
+    def test_validates_parameters_before_reading_frames(self) -> None:
+        with self.assertRaises(ValueError):
+            iter_transparent_holes(self.tmp_path / "missing.gif", connectivity=6)
+
+
+class StageTimingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        clear_stage_timings()
+
+    def tearDown(self) -> None:
+        clear_stage_timings()
+        self.tmp_dir.cleanup()
+
+    def test_result_reports_each_stage(self) -> None:
+        rgba = np.full((50, 60, 4), 255, dtype=np.uint8)
+        rgba[10:30, 10:40, 3] = 0
+        path = self.tmp_path / "frame.png"
+        Image.fromarray(rgba, mode="RGBA").save(path)
+
+        result = detect_primary_transparent_hole(
+            path, min_area=10, backend="numpy", overlay_output_path=self.tmp_path / "overlay.png", timings=True
+        )
+        assert result is not None
+        timings = result["timings"]
+        self.assertEqual(
+            list(timings), ["open", "decode", "convert", "threshold", "backend", "label", "stats", "encode", "write", "total"]
+        )
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+        self.assertLessEqual(sum(seconds for name, seconds in timings.items() if name != "total"), timings["total"])
+        self.assertNotIn("timings", detect_primary_transparent_hole(path, min_area=10) or {})
+
+    def test_summary_aggregates_calls_including_misses(self) -> None:
+        alpha = np.full((20, 20), 255, dtype=np.uint8)
+        alpha[2:8, 2:8] = 0
+        detect_transparent_holes_batch([alpha, alpha, np.full((20, 20), 255, dtype=np.uint8)], min_area=4, timings=True)
+        detect_primary_transparent_hole(alpha, min_area=4, timings=True)
+
+        summary = stage_timing_summary()
+        self.assertEqual(summary["total"]["count"], 4)
+        self.assertEqual(summary["label"]["count"], 4)
+        self.assertNotIn("open", summary)  # arrays are never opened or decoded
+        total = summary["total"]
+        self.assertLessEqual(total["p50"], total["p90"])
+        self.assertLessEqual(total["p99"], total["max"])
+        self.assertAlmostEqual(total["mean"] * total["count"], total["total"])
+
+        clear_stage_timings()
+        self.assertEqual(stage_timing_summary(), {})
+
+    def test_samples_can_be_exported_and_merged(self) -> None:
+        alpha = np.full((20, 20), 255, dtype=np.uint8)
+        alpha[2:8, 2:8] = 0
+        detect_primary_transparent_hole(alpha, min_area=4, timings=True)
+        samples = stage_timing_samples()
+        self.assertEqual(len(samples["total"]), 1)
+
+        record_stage_timings(samples)
+        self.assertEqual(stage_timing_summary()["total"]["count"], 2)
+        samples["total"].clear()  # exported samples are copies
+        self.assertEqual(stage_timing_summary()["total"]["count"], 2)
+
+
+class MaskEncodingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_rle_round_trip(self) -> None:
+        rng = np.random.default_rng(11)
+        for shape in [(1, 1), (5, 7), (40, 33)]:
+            for density in (0.0, 0.3, 1.0):
+                mask = rng.random(shape) < density
+                rle = encode_mask_rle(mask)
+                self.assertEqual(sum(rle["counts"]), mask.size)
+                np.testing.assert_array_equal(decode_mask_rle(rle), mask)
+
+        self.assertEqual(encode_mask_rle(np.array([[0, 1, 1], [1, 0, 0]], dtype=bool))["counts"], [1, 3, 2])
+
+    def test_rejects_rle_with_wrong_total(self) -> None:
+        with self.assertRaises(ValueError):
+            decode_mask_rle({"size": [2, 2], "counts": [1, 2]})
+
+    def test_detector_inline_rle_and_npz_mask(self) -> None:
+        alpha = np.full((70, 90), 255, dtype=np.uint8)
+        alpha[10:40, 20:60] = 0
+        alpha[20:30, 60:70] = 0
+        alpha[60:65, 5:10] = 0  # noise
+        expected = (alpha == 0) & (np.arange(70)[:, None] < 50)
+        npz_path = self.tmp_path / "masks" / "frame.npz"
+
+        for backend in ["numpy"] + (["scipy"] if _has_scipy() else []):
+            result = detect_primary_transparent_hole(
+                alpha, min_area=100, backend=backend, mask_rle=True, mask_output_path=npz_path
+            )
+            assert result is not None
+            np.testing.assert_array_equal(decode_mask_rle(result["mask_rle"]), expected)
+            np.testing.assert_array_equal(load_mask(npz_path), expected)
+
+    def test_save_mask_npz_round_trip(self) -> None:
+        mask = np.zeros((30, 40), dtype=bool)
+        mask[3:9, 30:38] = True
+        path = self.tmp_path / "mask.npz"
+        save_mask_npz(path, mask)
+        np.testing.assert_array_equal(load_mask(path), mask)
+
+        save_mask_npz(path, np.zeros((4, 4), dtype=bool))
+        np.testing.assert_array_equal(load_mask(path), np.zeros((4, 4), dtype=bool))
+
+
+class ContourPolygonTests(unittest.TestCase):
+    def test_rectangle_and_l_shape_corners(self) -> None:
+        alpha = np.full((20, 20), 255, dtype=np.uint8)
+        alpha[3:8, 4:10] = 0
+        result = detect_primary_transparent_hole(alpha, min_area=1, contour_tolerance=0)
+        assert result is not None
+        self.assertEqual(result["polygon"], [[4, 3], [10, 3], [10, 8], [4, 8]])
+
+        alpha[8:12, 4:6] = 0
+        result = detect_primary_transparent_hole(alpha, min_area=1, contour_tolerance=0)
+        assert result is not None
+        self.assertEqual(result["polygon"], [[4, 3], [10, 3], [10, 8], [6, 8], [6, 12], [4, 12]])
+
+    def test_outer_boundary_only_and_diagonal_neighbours(self) -> None:
+        alpha = np.full((12, 12), 255, dtype=np.uint8)
+        alpha[2:8, 2:8] = 0
+        alpha[4:6, 4:6] = 255  # interior island is not part of the outline
+        alpha[8, 8] = 0  # touches the square only diagonally
+        result = detect_primary_transparent_hole(alpha, min_area=1, backend="numpy", connectivity=8, contour_tolerance=0)
+        assert result is not None
+        self.assertEqual(
+            result["polygon"],
+            [[2, 2], [8, 2], [8, 8], [9, 8], [9, 9], [8, 9], [8, 8], [2, 8]],
+        )
+
+        result = detect_primary_transparent_hole(alpha, min_area=1, backend="numpy", connectivity=4, contour_tolerance=0)
+        assert result is not None
+        self.assertEqual(result["polygon"], [[2, 2], [8, 2], [8, 8], [2, 8]])
+
+    def test_tolerance_reduces_vertices(self) -> None:
+        yy, xx = np.mgrid[:80, :80]
+        alpha = np.where((yy - 40) ** 2 + (xx - 40) ** 2 < 30**2, 0, 255).astype(np.uint8)
+        exact = detect_primary_transparent_hole(alpha, min_area=1, contour_tolerance=0)
+        coarse = detect_primary_transparent_hole(alpha, min_area=1, contour_tolerance=2.0)
+        assert exact is not None and coarse is not None
+        self.assertLess(len(coarse["polygon"]), len(exact["polygon"]) // 4)
+        self.assertTrue(set(map(tuple, coarse["polygon"])) <= set(map(tuple, exact["polygon"])))
+
+    def test_tracker_polygon_is_in_frame_coordinates(self) -> None:
+        alpha = np.full((60, 60), 255, dtype=np.uint8)
+        alpha[20:30, 25:40] = 0
+        tracker = TransparentHoleTracker(min_area=1, backend="numpy")
+        first = tracker.detect(alpha, contour_tolerance=0)
+        second = tracker.detect(alpha, contour_tolerance=0)
+        assert first is not None and second is not None
+        self.assertEqual(tracker.roi_frames, 1)
+        self.assertEqual(second["polygon"], [[25, 20], [40, 20], [40, 30], [25, 30]])
+        self.assertEqual(first["polygon"], second["polygon"])
+
+    def test_rejects_negative_tolerance(self) -> None:
+        with self.assertRaises(ValueError):
+            detect_primary_transparent_hole(np.zeros((4, 4), dtype=np.uint8), contour_tolerance=-1)
+
+
+class InscribedRectTests(unittest.TestCase):
+    def test_rectangle_inside_l_shape_and_ring(self) -> None:
+        alpha = np.full((30, 30), 255, dtype=np.uint8)
+        alpha[2:20, 3:8] = 0  # tall arm, 18 x 5
+        alpha[15:20, 3:25] = 0  # wide foot, 5 x 22
+        result = detect_primary_transparent_hole(alpha, min_area=1, inscribed_rect=True)
+        assert result is not None
+        self.assertEqual(result["inscribed_rect"], {"x": 3, "y": 15, "width": 22, "height": 5})
+
+        alpha[15:20, 10:12] = 255  # cut the foot: the arm plus its stub now wins
+        result = detect_primary_transparent_hole(alpha, min_area=1, inscribed_rect=True)
+        assert result is not None
+        self.assertEqual(result["inscribed_rect"], {"x": 3, "y": 2, "width": 5, "height": 18})
+
+    def test_matches_brute_force_on_random_components(self) -> None:
+        rng = np.random.default_rng(21)
+        for trial in range(30):
+            alpha = np.where(rng.random((12, 9)) < 0.7, 0, 255).astype(np.uint8)
+            result = detect_primary_transparent_hole(
+                alpha, min_area=1, backend="numpy", connectivity=4, inscribed_rect=True, mask_rle=True
+            )
+            if result is None:
+                continue
+            region = decode_mask_rle(result["mask_rle"])
+            rect = result["inscribed_rect"]
+            self.assertTrue(region[rect["y"] : rect["y"] + rect["height"], rect["x"] : rect["x"] + rect["width"]].all())
+            best = max(
+                (x1 - x0) * (y1 - y0)
+                for y0 in range(12)
+                for y1 in range(y0 + 1, 13)
+                for x0 in range(9)
+                for x1 in range(x0 + 1, 10)
+                if region[y0:y1, x0:x1].all()
+            )
+            self.assertEqual(rect["width"] * rect["height"], best, msg=f"trial {trial}")
+
+    def test_tracker_reports_frame_coordinates(self) -> None:
+        alpha = np.full((50, 80), 255, dtype=np.uint8)
+        alpha[10:40, 20:70] = 0
+        tracker = TransparentHoleTracker(min_area=1, backend="numpy")
+        tracker.detect(alpha)
+        result = tracker.detect(alpha, inscribed_rect=True)
+        assert result is not None
+        self.assertEqual(tracker.roi_frames, 1)
+        self.assertEqual(result["inscribed_rect"], {"x": 20, "y": 10, "width": 50, "height": 30})
+
+
+@unittest.skipUnless(_has_scipy() or _has_cv2(), "auto calibration needs two backends")
+class AutoBackendCalibrationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = Path(self.tmp_dir.name) / "backend_cache.json"
+        clear_auto_backend_choices()
+
+    def tearDown(self) -> None:
+        set_auto_backend_cache_path(None)
+        clear_auto_backend_choices()
+        self.tmp_dir.cleanup()
+
+    def _alpha(self, height: int, width: int) -> np.ndarray:
+        alpha = np.full((height, width), 255, dtype=np.uint8)
+        alpha[height // 4 : height // 2, width // 4 : width // 2] = 0
+        return alpha
+
+    def test_calibrates_once_per_size_bucket_and_connectivity(self) -> None:
+        with mock.patch.object(
+            image_utils, "_calibrate_backends", wraps=image_utils._calibrate_backends
+        ) as calibrate:
+            first = detect_primary_transparent_hole(self._alpha(100, 120), min_area=10)
+            detect_primary_transparent_hole(self._alpha(100, 121), min_area=10)
+            detect_primary_transparent_hole(self._alpha(100, 120), min_area=10, connectivity=4)
+            detect_primary_transparent_hole(self._alpha(400, 500), min_area=10)
+
+        self.assertEqual(calibrate.call_count, 3)
+        assert first is not None
+        self.assertEqual(first["backend_selection"], "calibrated")
+        choices = auto_backend_choices()
+        self.assertEqual(len(choices), 3)
+        self.assertIn(first["backend"], {choice["backend"] for choice in choices.values()})
+
+    def test_persisted_choice_is_reused_without_recalibrating(self) -> None:
+        set_auto_backend_cache_path(self.cache_path)
+        result = detect_primary_transparent_hole(self._alpha(100, 120), min_area=10)
+        assert result is not None
+        stored = json.loads(self.cache_path.read_text(encoding="utf-8"))["choices"]
+        self.assertEqual([choice["backend"] for choice in stored.values()], [result["backend"]])
+
+        clear_auto_backend_choices()
+        set_auto_backend_cache_path(self.cache_path)
+        with mock.patch.object(image_utils, "_calibrate_backends", side_effect=AssertionError):
+            again = detect_primary_transparent_hole(self._alpha(100, 120), min_area=10)
+        assert again is not None
+        self.assertEqual(again["backend"], result["backend"])
+
+    def test_calibration_can_run_up_front_and_seed_other_processes(self) -> None:
+        set_auto_backend_cache_path(self.cache_path)
+        backend = calibrate_auto_backend(self._alpha(100, 120))
+        choices = auto_backend_choices()
+        self.assertEqual([choice["backend"] for choice in choices.values()], [backend])
+        self.assertEqual(list(self.cache_path.parent.glob("*.tmp")), [])
+
+        set_auto_backend_cache_path(None)
+        clear_auto_backend_choices()
+        seed_auto_backend_choices(choices)
+        with mock.patch.object(image_utils, "_calibrate_backends", side_effect=AssertionError):
+            result = detect_primary_transparent_hole(self._alpha(100, 120), min_area=10)
+        assert result is not None
+        self.assertEqual(result["backend"], backend)
+
+    def test_explicit_backend_is_not_recorded_as_a_selection(self) -> None:
+        result = detect_primary_transparent_hole(self._alpha(60, 60), min_area=10, backend="numpy")
+        assert result is not None
+        self.assertNotIn("backend_selection", result)
+        self.assertEqual(auto_backend_choices(), {})
+
+
+class TransparentHoleTrackerTests(unittest.TestCase):
+    def _frame(self, x: int, y: int, *, width: int = 40, height: int = 30) -> np.ndarray:
+        alpha = np.full((150, 200), 255, dtype=np.uint8)
+        alpha[y : y + height, x : x + width] = 0
+        return alpha
+
+    def test_tracks_moving_hole_inside_roi(self) -> None:
+        tracker = TransparentHoleTracker(min_area=500, backend="numpy", roi_margin=8)
+        for step in range(6):
+            frame = self._frame(30 + step * 3, 40 + step * 2)
+            result = tracker.detect(frame)
+            self.assertEqual(result, detect_primary_transparent_hole(frame, min_area=500, backend="numpy"))
+
+        self.assertEqual(tracker.full_frames, 1)
+        self.assertEqual(tracker.roi_frames, 5)
+
+    def test_falls_back_to_full_frame_when_hole_jumps_or_vanishes(self) -> None:
+        tracker = TransparentHoleTracker(min_area=500, roi_margin=4)
+        tracker.detect(self._frame(10, 10))
+
+        jumped = tracker.detect(self._frame(140, 100))
+        assert jumped is not None
+        self.assertEqual(jumped["bbox"], {"x": 140, "y": 100, "width": 40, "height": 30})
+
+        self.assertIsNone(tracker.detect(np.full((150, 200), 255, dtype=np.uint8)))
+        self.assertEqual(tracker.full_frames, 3)
+
+    def test_rejects_roi_answer_when_larger_hole_appears_elsewhere(self) -> None:
+        tracker = TransparentHoleTracker(min_area=500, roi_margin=4)
+        tracker.detect(self._frame(10, 10))
+
+        frame = self._frame(12, 10)
+        frame[80:140, 100:190] = 0
+        result = tracker.detect(frame)
+
+        assert result is not None
+        self.assertEqual(result["bbox"], {"x": 100, "y": 80, "width": 90, "height": 60})
+        self.assertEqual(tracker.roi_frames, 0)
+
+    def test_rejects_roi_answer_when_cut_components_join_outside_roi(self) -> None:
+        backends = ["numpy"] + [name for name, available in (("scipy", _has_scipy()), ("opencv", _has_cv2())) if available]
+        for backend in backends:
+            with self.subTest(backend=backend):
+                tracker = TransparentHoleTracker(min_area=50, backend=backend, roi_margin=10)
+                first = np.full((200, 200), 255, dtype=np.uint8)
+                first[80:120, 80:120] = 0  # ROI becomes 70..130 on both axes
+                tracker.detect(first)
+
+                frame = np.full((200, 200), 255, dtype=np.uint8)
+                frame[100:112, 100:114] = 0  # 168 px hole inside the ROI
+                frame[70:80, 72:82] = 0  # two 100 px blobs cut by the ROI top edge...
+                frame[70:80, 84:94] = 0
+                frame[69, 78:86] = 0  # ...joined by an 8 px bridge just outside it
+                result = tracker.detect(frame)
+
+                expected = detect_primary_transparent_hole(frame, min_area=50, backend=backend)
+                assert result is not None and expected is not None
+                self.assertEqual(expected["area"], 208)
+                self.assertEqual(result["bbox"], expected["bbox"])
+                self.assertEqual(result["area"], 208)
+                self.assertEqual(tracker.roi_frames, 0)
+
+    def test_rejects_negative_margin(self) -> None:
+        with self.assertRaises(ValueError):
+            TransparentHoleTracker(roi_margin=-1)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
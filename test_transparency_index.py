@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from transparency_index import TransparencyIndex
+
+
+class TransparencyIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(20)
+        self.alpha = rng.integers(0, 256, size=(31, 47), dtype=np.uint8)
+        self.mask = self.alpha < 128
+        self.index = TransparencyIndex.from_image(self.alpha, alpha_threshold=128)
+
+    def test_counts_and_fractions_match_brute_force(self) -> None:
+        rng = np.random.default_rng(21)
+        rects = np.column_stack(
+            [rng.integers(-5, 50, 200), rng.integers(-5, 35, 200), rng.integers(0, 30, 200), rng.integers(0, 30, 200)]
+        )
+        fractions = self.index.fractions(rects)
+        for (x, y, width, height), fraction in zip(rects.tolist(), fractions):
+            region = self.mask[max(y, 0) : max(y + height, 0), max(x, 0) : max(x + width, 0)]
+            self.assertEqual(self.index.count(x, y, width, height), int(region.sum()))
+            expected = float(region.mean()) if region.size else 0.0
+            self.assertAlmostEqual(self.index.fraction(x, y, width, height), expected)
+            self.assertAlmostEqual(fraction, expected)
+        self.assertEqual(self.index.total, int(self.mask.sum()))
+
+    def test_save_load_round_trip(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "frame.npz"
+            self.index.save(path)
+            loaded = TransparencyIndex.load(path)
+        self.assertEqual(loaded.shape, (31, 47))
+        self.assertEqual(loaded.alpha_threshold, 128)
+        np.testing.assert_array_equal(loaded.table, self.index.table)
+        np.testing.assert_array_equal(loaded.mask(), self.mask)
+
+    def test_rejects_invalid_threshold(self) -> None:
+        with self.assertRaises(ValueError):
+            TransparencyIndex.from_image(self.alpha, alpha_threshold=0)
+
+
+if __name__ == "__main__":
+    unittest.main()